@@ -1,19 +1,65 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for # pyright: ignore[reportMissingImports]
+from flask import Flask, Response, render_template, stream_template, stream_with_context, request, jsonify, redirect, url_for # pyright: ignore[reportMissingImports]
+import click  # pyright: ignore[reportMissingImports]
 import sqlite3
 from datetime import datetime
+import base64
+import json
 import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.sqlite_pool import ConnectionPool  # noqa: E402
+from shared.static_assets import AssetPipeline  # noqa: E402
+from shared.rate_limit import RateLimiter  # noqa: E402
+import write_behind  # noqa: E402
+import search  # noqa: E402
+import export  # noqa: E402
+from page_cache import PageCache  # noqa: E402
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
+# Queue contact/newsletter submissions and group-commit them in the background
+app.config['WRITE_BEHIND'] = os.environ.get('WRITE_BEHIND', '0') == '1'
+app.config['WRITE_BEHIND_BATCH_SIZE'] = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 200))
+app.config['WRITE_BEHIND_FLUSH_MS'] = int(os.environ.get('WRITE_BEHIND_FLUSH_MS', 50))
+app.config['WRITE_BEHIND_MAX_PENDING'] = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', 10000))
+
+# Serve the static marketing pages from a rendered, pre-compressed cache
+app.config['PAGE_CACHE'] = os.environ.get('PAGE_CACHE', '1') == '1'
+app.config['PAGE_CACHE_LOCALES'] = ['en']
+# Per-IP token buckets on the form endpoints (429 once a client's bucket is empty)
+app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT', '1') == '1'
+app.config['CONTACTS_PER_PAGE'] = 50
+app.config['COUNT_CACHE_TTL'] = 30  # seconds
 
 # Database setup
 DATABASE = 'website.db'
+pool = ConnectionPool(DATABASE).init_app(app)
+ingest_queue = None
+page_cache = PageCache(app)
+assets = AssetPipeline(app)
+limiter = RateLimiter(
+    app,
+    on_reject=lambda retry_after: jsonify({'success': False, 'message': 'Too many requests, please try again later.'})
+)
+
+def start_write_behind():
+    """Start the background writer if write-behind mode is enabled"""
+    global ingest_queue
+    if app.config['WRITE_BEHIND'] and ingest_queue is None:
+        ingest_queue = write_behind.WriteBehindQueue(
+            pool,
+            batch_size=app.config['WRITE_BEHIND_BATCH_SIZE'],
+            flush_interval=app.config['WRITE_BEHIND_FLUSH_MS'] / 1000,
+            max_pending=app.config['WRITE_BEHIND_MAX_PENDING'],
+        ).start()
+    return ingest_queue
 
 def get_db():
-    """Create database connection"""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get this thread's pooled database connection"""
+    return pool.acquire()
 
 def init_db():
     """Initialize database with tables"""
@@ -35,25 +81,157 @@ def init_db():
                 subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        # Keyset pagination of the admin view walks this index newest-first
+        db.execute('''
+            CREATE INDEX IF NOT EXISTS idx_contacts_created_at_id
+            ON contacts (created_at, id)
+        ''')
+        fts_current = search.is_current(db)
+        app.config['SEARCH_ENABLED'] = search.install(db)
         db.commit()
-        db.close()
+        if app.config['SEARCH_ENABLED'] and not fts_current:
+            search.rebuild(db)
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index():
+    """Backfill the contacts full-text index from existing rows"""
+    init_db()
+    with app.app_context():
+        if not app.config['SEARCH_ENABLED']:
+            print('This SQLite build has no FTS5 support.')
+            return
+        count = search.rebuild(get_db())
+    print('Indexed %d contacts.' % count)
+
+@app.cli.command('export')
+@click.argument('table', type=click.Choice(sorted(export.TABLES)))
+@click.option('--format', 'fmt', type=click.Choice(sorted(export.FORMATS)), default='csv')
+@click.option('--since-id', type=int, help='Only rows with a larger id')
+@click.option('--since', help="Only rows created at or after this timestamp ('YYYY-MM-DD HH:MM:SS')")
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output')
+@click.option('--output', '-o', type=click.File('wb'), default='-')
+def export_table(table, fmt, since_id, since, compress, output):
+    """Stream a table to a CSV/NDJSON file (stdout by default)"""
+    with pool.connection() as db:
+        for chunk in export.export_stream(db, table, fmt, since_id, since, compress):
+            output.write(chunk)
+
+# ==================== ADMIN PAGINATION ====================
+
+_count_cache = {}
+_count_lock = threading.Lock()
+
+def cached_count(table):
+    """COUNT(*) of a table, recomputed at most once per COUNT_CACHE_TTL"""
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(table)
+    if cached and now - cached[1] < app.config['COUNT_CACHE_TTL']:
+        return cached[0]
+    count = get_db().execute('SELECT COUNT(*) FROM %s' % table).fetchone()[0]
+    with _count_lock:
+        _count_cache[table] = (count, now)
+    return count
+
+def encode_cursor(row):
+    """Opaque page cursor for a (created_at, id) position"""
+    raw = json.dumps([row['created_at'], row['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Inverse of encode_cursor, None for a missing or malformed cursor"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_at, row_id = json.loads(raw)
+        return str(created_at), int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+class ContactPage:
+    """One page of contacts, newest first, read straight off the index
+
+    Iterating yields rows as the cursor produces them so the template can
+    stream them out.  ``next_cursor`` is only known once iteration is done,
+    which is why the template renders the pager after the table.
+    """
+
+    COLUMNS = 'id, name, email, message, created_at'
+
+    def __init__(self, db, per_page, before=None, after=None):
+        self.per_page = per_page
+        self.has_prev = False
+        self.has_next = False
+        self._first = None
+        self._last = None
+        if after is not None:
+            # Going back towards newer rows: read them oldest-first, then flip
+            # the (at most per_page) rows so the page is still newest-first.
+            rows = db.execute(
+                'SELECT %s FROM contacts WHERE (created_at, id) > (?, ?) '
+                'ORDER BY created_at ASC, id ASC LIMIT ?' % self.COLUMNS,
+                (after[0], after[1], per_page + 1)
+            ).fetchall()
+            self.has_prev = len(rows) > per_page
+            self.has_next = True
+            self._rows = iter(reversed(rows[:per_page]))
+        elif before is not None:
+            self.has_prev = True
+            self._rows = db.execute(
+                'SELECT %s FROM contacts WHERE (created_at, id) < (?, ?) '
+                'ORDER BY created_at DESC, id DESC LIMIT ?' % self.COLUMNS,
+                (before[0], before[1], per_page + 1)
+            )
+        else:
+            self._rows = db.execute(
+                'SELECT %s FROM contacts ORDER BY created_at DESC, id DESC LIMIT ?' % self.COLUMNS,
+                (per_page + 1,)
+            )
+        self._peeked = next(self._rows, None)
+
+    @property
+    def has_rows(self):
+        return self._peeked is not None
+
+    def __iter__(self):
+        row, yielded = self._peeked, 0
+        while row is not None:
+            if yielded == self.per_page:
+                self.has_next = True
+                break
+            if self._first is None:
+                self._first = row
+            self._last = row
+            yield row
+            yielded += 1
+            row = next(self._rows, None)
+
+    @property
+    def prev_cursor(self):
+        return encode_cursor(self._first) if self.has_prev and self._first else None
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self._last) if self.has_next and self._last else None
 
 @app.route('/')
 def index():
     """Home page route"""
-    return render_template('index.html')
+    return page_cache.render('index.html')
 
 @app.route('/about')
 def about():
     """About page route"""
-    return render_template('about.html')
+    return page_cache.render('about.html')
 
 @app.route('/services')
 def services():
     """Services page route"""
-    return render_template('services.html')
+    return page_cache.render('services.html')
 
 @app.route('/contact', methods=['GET', 'POST'])
+@limiter.limit(5, burst=5, per='minute', methods=['POST'])
 def contact():
     """Contact page route with form handling"""
     if request.method == 'POST':
@@ -62,19 +240,23 @@ def contact():
         message = request.form.get('message')
         
         if name and email and message:
+            if ingest_queue is not None:
+                if not ingest_queue.submit_contact(name, email, message):
+                    return jsonify({'success': False, 'message': 'Server busy, please try again.'}), 503
+                return jsonify({'success': True, 'message': 'Message sent successfully!'})
             db = get_db()
             db.execute(
                 'INSERT INTO contacts (name, email, message) VALUES (?, ?, ?)',
                 (name, email, message)
             )
             db.commit()
-            db.close()
             return jsonify({'success': True, 'message': 'Message sent successfully!'})
         return jsonify({'success': False, 'message': 'All fields are required!'})
     
     return render_template('contact.html')
 
 @app.route('/api/newsletter', methods=['POST'])
+@limiter.limit(5, burst=3, per='minute')
 def newsletter():
     """Newsletter subscription endpoint"""
     data = request.get_json()
@@ -83,23 +265,78 @@ def newsletter():
     if not email:
         return jsonify({'success': False, 'message': 'Email is required!'})
     
+    if ingest_queue is not None:
+        status = ingest_queue.subscribe(email)
+        if status == write_behind.DUPLICATE:
+            return jsonify({'success': False, 'message': 'Email already subscribed!'})
+        if status == write_behind.BUSY:
+            return jsonify({'success': False, 'message': 'Server busy, please try again.'}), 503
+        return jsonify({'success': True, 'message': 'Subscribed successfully!'})
+    
     try:
         db = get_db()
         db.execute('INSERT INTO newsletter (email) VALUES (?)', (email,))
         db.commit()
-        db.close()
         return jsonify({'success': True, 'message': 'Subscribed successfully!'})
     except sqlite3.IntegrityError:
         return jsonify({'success': False, 'message': 'Email already subscribed!'})
 
 @app.route('/admin/contacts')
 def admin_contacts():
-    """View all contact form submissions"""
+    """View contact form submissions, one keyset page at a time"""
+    per_page = request.args.get('per_page', app.config['CONTACTS_PER_PAGE'], type=int)
+    per_page = max(1, min(per_page, 500))
     db = get_db()
-    contacts = db.execute('SELECT * FROM contacts ORDER BY created_at DESC').fetchall()
-    db.close()
-    return render_template('admin_contacts.html', contacts=contacts)
+    page = ContactPage(
+        db,
+        per_page,
+        before=decode_cursor(request.args.get('before')),
+        after=decode_cursor(request.args.get('after'))
+    )
+    return stream_template('admin_contacts.html', page=page, total_count=cached_count('contacts'))
+
+@app.route('/admin/contacts/search')
+def admin_contacts_search():
+    """Ranked full-text search over contact submissions"""
+    if not app.config.get('SEARCH_ENABLED'):
+        return jsonify({'error': 'Search is not available'}), 503
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    results = search.search(get_db(), query, limit)
+    return jsonify({'query': query, 'count': len(results), 'results': results})
+
+@app.route('/admin/export/<table>.<fmt>')
+def admin_export(table, fmt):
+    """Stream a table as CSV or NDJSON, optionally gzipped and incremental"""
+    if table not in export.TABLES or fmt not in export.FORMATS:
+        return jsonify({'error': 'Not found'}), 404
+    compress = request.args.get('gzip') == '1'
+    chunks = export.export_stream(
+        get_db(), table, fmt,
+        since_id=request.args.get('since_id', type=int),
+        since=request.args.get('since'),
+        compress=compress
+    )
+    filename = '%s.%s%s' % (table, fmt, '.gz' if compress else '')
+    headers = {'Content-Disposition': 'attachment; filename=%s' % filename}
+    mimetype = 'application/gzip' if compress else export.FORMATS[fmt]
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+@app.route('/admin/rate-limits')
+def rate_limits():
+    """Admission-control counters per route"""
+    return jsonify(limiter.get_stats())
+
+@app.route('/admin/db-stats')
+def db_stats():
+    """Connection pool statistics"""
+    stats = pool.get_stats()
+    stats['page_cache'] = page_cache.get_stats()
+    if ingest_queue is not None:
+        stats['write_behind'] = ingest_queue.get_stats()
+    return jsonify(stats)
 
 if __name__ == '__main__':
     init_db()
+    start_write_behind()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""Streaming CSV / NDJSON export of the contacts and newsletter tables
+
+Rows are walked in primary-key order, ``batch_size`` at a time, with a
+keyset condition (``id > last_id``) so every batch is an index range scan
+and memory use stays flat however large the table is.  Each stage is a
+generator: rows -> encoded text chunks -> optional gzip chunks, which the
+HTTP endpoint and the CLI command both consume.
+"""
+import csv
+import io
+import json
+import zlib
+
+TABLES = {
+    'contacts': {
+        'columns': ('id', 'name', 'email', 'message', 'created_at'),
+        'time_column': 'created_at',
+    },
+    'newsletter': {
+        'columns': ('id', 'email', 'subscribed_at'),
+        'time_column': 'subscribed_at',
+    },
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def iter_batches(db, table, since_id=None, since=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield lists of rows from ``table`` in id order
+
+    ``since_id`` exports rows with a larger id, ``since`` rows whose
+    timestamp is at or after the given value (same text format SQLite
+    stores, e.g. ``2025-01-31 00:00:00``).
+    """
+    spec = TABLES[table]
+    sql = 'SELECT %s FROM %s WHERE id > ?' % (', '.join(spec['columns']), table)
+    params = []
+    if since is not None:
+        sql += ' AND %s >= ?' % spec['time_column']
+        params.append(since)
+    sql += ' ORDER BY id LIMIT ?'
+
+    last_id = since_id or 0
+    while True:
+        rows = db.execute(sql, [last_id] + params + [batch_size]).fetchall()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1][0]
+
+
+def csv_chunks(batches, columns):
+    """Encode row batches as CSV text, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(tuple(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(batches, columns):
+    """Encode row batches as newline-delimited JSON, one chunk per batch"""
+    for rows in batches:
+        yield ''.join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of text chunks into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(db, table, fmt='csv', since_id=None, since=None,
+                  compress=False, batch_size=DEFAULT_BATCH_SIZE):
+    """Chunks (bytes) of a complete export of ``table``"""
+    if table not in TABLES:
+        raise ValueError('Unknown table: %s' % table)
+    if fmt not in FORMATS:
+        raise ValueError('Unknown format: %s' % fmt)
+    columns = TABLES[table]['columns']
+    batches = iter_batches(db, table, since_id, since, batch_size)
+    chunks = csv_chunks(batches, columns) if fmt == 'csv' else ndjson_chunks(batches, columns)
+    if compress:
+        return gzip_chunks(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
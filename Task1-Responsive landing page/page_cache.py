@@ -0,0 +1,158 @@
+"""Rendered-page cache for templates that only change between deploys
+
+The home, about and services pages render the same HTML for every visitor,
+so each (template, locale) pair is rendered once and kept together with a
+strong ETag and pre-compressed gzip/brotli bodies.  Requests are answered
+from memory, or with a bodiless 304 when the browser already has the
+current version.  An entry is re-rendered as soon as the modification time
+of its template, or of any template it extends/includes, changes.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+from flask import Response, render_template, request  # pyright: ignore[reportMissingImports]
+from jinja2 import meta  # pyright: ignore[reportMissingImports]
+
+try:
+    import brotli  # pyright: ignore[reportMissingImports]
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+# Below this size compression costs more than it saves
+MIN_COMPRESS_SIZE = 512
+
+
+class CachedPage:
+    __slots__ = ('body', 'etag', 'variants', 'files', 'mtimes', 'checked_at')
+
+    def __init__(self, body, files, mtimes):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        # content-coding -> (body, etag); each coding is its own
+        # representation so it gets its own strong validator
+        self.variants = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.variants['gzip'] = (gzip.compress(body, 9, mtime=0), self.etag + '-gz')
+            if brotli is not None:
+                self.variants['br'] = (brotli.compress(body, quality=11), self.etag + '-br')
+        self.files = files
+        self.mtimes = mtimes
+        self.checked_at = time.monotonic()
+
+
+class PageCache:
+    """Cache of fully rendered, pre-compressed template responses"""
+
+    def __init__(self, app=None, locales=('en',), check_interval=1.0, max_age=0):
+        self.locales = list(locales)
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self.enabled = True
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('PAGE_CACHE', True)
+        self.locales = app.config.get('PAGE_CACHE_LOCALES', self.locales)
+        return self
+
+    def _template_files(self, name, seen=None):
+        """Source files of a template and everything it extends or includes"""
+        seen = set() if seen is None else seen
+        if name in seen:
+            return []
+        seen.add(name)
+        env = self.app.jinja_env
+        source, filename, _ = env.loader.get_source(env, name)
+        files = [filename]
+        for parent in meta.find_referenced_templates(env.parse(source)):
+            if parent:
+                files.extend(self._template_files(parent, seen))
+        return files
+
+    @staticmethod
+    def _mtimes(files):
+        try:
+            return tuple(os.stat(f).st_mtime_ns for f in files)
+        except OSError:
+            return None
+
+    def _is_fresh(self, entry):
+        now = time.monotonic()
+        if now - entry.checked_at < self.check_interval:
+            return True
+        if self._mtimes(entry.files) != entry.mtimes:
+            return False
+        entry.checked_at = now
+        return True
+
+    def _get(self, template, locale, context):
+        key = (template, locale)
+        entry = self._entries.get(key)
+        if entry is not None and self._is_fresh(entry):
+            self.hits += 1
+            return entry
+        with self._lock:
+            # Another thread may have re-rendered while we waited
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry):
+                self.hits += 1
+                return entry
+            self.misses += 1
+            files = self._template_files(template)
+            mtimes = self._mtimes(files)
+            body = render_template(template, locale=locale, **context).encode('utf-8')
+            entry = CachedPage(body, files, mtimes)
+            self._entries[key] = entry
+            return entry
+
+    def render(self, template, **context):
+        """Drop-in replacement for render_template on static pages"""
+        if not self.enabled:
+            return render_template(template, **context)
+
+        locale = request.accept_languages.best_match(self.locales) or self.locales[0]
+        entry = self._get(template, locale, context)
+
+        body, etag, coding = entry.body, entry.etag, None
+        for candidate in ('br', 'gzip'):
+            if candidate in entry.variants and candidate in request.accept_encodings:
+                coding = candidate
+                body, etag = entry.variants[candidate]
+                break
+
+        headers = {
+            'ETag': '"%s"' % etag,
+            'Vary': 'Accept-Encoding, Accept-Language',
+            'Cache-Control': 'public, max-age=%d' % self.max_age if self.max_age else 'no-cache',
+            'Content-Language': locale,
+        }
+        if request.if_none_match.contains(etag):
+            self.not_modified += 1
+            return Response(status=304, headers=headers)
+        if coding:
+            headers['Content-Encoding'] = coding
+        return Response(body, mimetype='text/html', headers=headers)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'brotli': brotli is not None,
+        }
@@ -0,0 +1,142 @@
+"""Full-text search over contact submissions (SQLite FTS5)
+
+``contacts_fts`` is an external-content FTS5 table: it stores only the
+inverted index and reads the text back from ``contacts`` by rowid, so the
+messages are not duplicated on disk.  Triggers keep it in step with every
+insert, update and delete on ``contacts``, including the batched inserts
+made by the write-behind queue.
+"""
+import sqlite3
+
+from markupsafe import escape  # pyright: ignore[reportMissingImports]
+
+# Every search term is a prefix query; prefix indexes for 2- and 3-character
+# prefixes let those resolve from one index range instead of scanning and
+# merging every term that starts with the prefix
+PREFIX_OPTION = "prefix='2 3'"
+
+SCHEMA = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+        name, email, message,
+        content='contacts', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        %s
+    )
+    ''' % PREFIX_OPTION,
+    '''
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_insert AFTER INSERT ON contacts BEGIN
+        INSERT INTO contacts_fts (rowid, name, email, message)
+        VALUES (new.id, new.name, new.email, new.message);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_delete AFTER DELETE ON contacts BEGIN
+        INSERT INTO contacts_fts (contacts_fts, rowid, name, email, message)
+        VALUES ('delete', old.id, old.name, old.email, old.message);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_update AFTER UPDATE ON contacts BEGIN
+        INSERT INTO contacts_fts (contacts_fts, rowid, name, email, message)
+        VALUES ('delete', old.id, old.name, old.email, old.message);
+        INSERT INTO contacts_fts (rowid, name, email, message)
+        VALUES (new.id, new.name, new.email, new.message);
+    END
+    ''',
+]
+
+# Matches in name and email count for more than matches in the message body.
+# Storing it as the table's rank function lets "ORDER BY rank LIMIT n" use
+# FTS5's top-n optimisation instead of scoring then sorting every match.
+RANK_FUNCTION = 'bm25(10.0, 5.0, 1.0)'
+
+# Snippet markers are control characters so the message text can be HTML
+# escaped first and the markers turned into <mark> tags afterwards.
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+SEARCH_SQL = '''
+    SELECT c.id, c.name, c.email, c.created_at,
+           snippet(contacts_fts, 2, ?, ?, '...', 16) AS snippet,
+           rank
+    FROM contacts_fts
+    JOIN contacts c ON c.id = contacts_fts.rowid
+    WHERE contacts_fts MATCH ?
+    ORDER BY rank
+    LIMIT ?
+'''
+
+
+def _table_sql(db):
+    row = db.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'contacts_fts'"
+    ).fetchone()
+    return row[0] if row else None
+
+
+def is_current(db):
+    """True if the FTS table exists with the current options"""
+    sql = _table_sql(db)
+    return sql is not None and PREFIX_OPTION in sql
+
+
+def install(db):
+    """Create the FTS table and sync triggers, False if FTS5 is unavailable
+
+    A table created before the prefix indexes is dropped and recreated; the
+    caller rebuilds it (see ``is_current``).
+    """
+    try:
+        if _table_sql(db) is not None and not is_current(db):
+            db.execute('DROP TABLE contacts_fts')
+        for statement in SCHEMA:
+            db.execute(statement)
+        db.execute(
+            "INSERT INTO contacts_fts (contacts_fts, rank) VALUES ('rank', ?)",
+            (RANK_FUNCTION,)
+        )
+    except sqlite3.OperationalError as e:
+        if 'fts5' in str(e):
+            return False
+        raise
+    return True
+
+
+def rebuild(db):
+    """Re-index every existing contact (backfill after install)"""
+    db.execute("INSERT INTO contacts_fts (contacts_fts) VALUES ('rebuild')")
+    db.execute("INSERT INTO contacts_fts (contacts_fts) VALUES ('optimize')")
+    db.commit()
+    return db.execute('SELECT COUNT(*) FROM contacts').fetchone()[0]
+
+
+def build_match_query(text):
+    """Turn free text into a safe FTS5 query
+
+    Every whitespace-separated term becomes a quoted prefix query, so user
+    input can never be parsed as FTS5 syntax (AND/OR/NEAR, column filters,
+    unbalanced quotes).  Terms are implicitly ANDed.
+    """
+    terms = [t.replace('"', '""') for t in text.split()]
+    return ' '.join('"%s"*' % t for t in terms if t.strip('"'))
+
+
+def _render_snippet(raw):
+    html = str(escape(raw or ''))
+    return html.replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+
+
+def search(db, text, limit=20):
+    """Ranked matches for ``text`` with highlighted message snippets"""
+    query = build_match_query(text)
+    if not query:
+        return []
+    rows = db.execute(SEARCH_SQL, (_MARK_OPEN, _MARK_CLOSE, query, limit)).fetchall()
+    return [{
+        'id': row['id'],
+        'name': row['name'],
+        'email': row['email'],
+        'created_at': row['created_at'],
+        'snippet': _render_snippet(row['snippet']),
+        'score': round(-row['rank'], 4),
+    } for row in rows]
@@ -0,0 +1,95 @@
+"""Write-behind ingestion for contact and newsletter submissions
+
+Instead of every request running its own INSERT + COMMIT (one fsync and one
+trip through the SQLite writer lock each), submissions are pushed onto a
+bounded in-process queue.  A single background writer drains it and commits
+whole batches with ``executemany`` every ``batch_size`` rows or every
+``flush_interval`` seconds, whichever comes first.  The queue and writer
+thread are ``shared.batch_writer.BatchWriter``; this module adds the SQL and
+the newsletter duplicate check.
+"""
+import sqlite3
+import threading
+
+from shared.batch_writer import BatchWriter
+
+CONTACT = 'contact'
+NEWSLETTER = 'newsletter'
+
+INSERT_SQL = {
+    CONTACT: 'INSERT INTO contacts (name, email, message) VALUES (?, ?, ?)',
+    # The UNIQUE constraint is still the source of truth; OR IGNORE keeps one
+    # duplicate that slipped past the in-memory check from failing the batch.
+    NEWSLETTER: 'INSERT OR IGNORE INTO newsletter (email) VALUES (?)',
+}
+
+# Result codes for subscribe()
+QUEUED = 'queued'
+DUPLICATE = 'duplicate'
+BUSY = 'busy'
+
+
+class WriteBehindQueue(BatchWriter):
+    """Bounded submission queue flushed in group commits by one writer thread"""
+
+    name = 'write-behind'
+    # Typically "database is locked" past the busy timeout
+    retry_on = sqlite3.OperationalError
+
+    def __init__(self, pool, batch_size=200, flush_interval=0.05,
+                 max_pending=10000, put_timeout=0.25, max_retries=5):
+        super().__init__(batch_size=batch_size, flush_interval=flush_interval, max_pending=max_pending,
+                         put_timeout=put_timeout, max_retries=max_retries)
+        self.pool = pool
+        self._pending_emails = set()
+        self._email_lock = threading.Lock()
+        self._stats['duplicates'] = 0
+
+    def submit_contact(self, name, email, message):
+        """Queue a contact submission, False if the queue is full"""
+        return self.put((CONTACT, (name, email, message)))
+
+    def subscribe(self, email):
+        """Queue a newsletter subscription
+
+        Returns ``QUEUED``, ``DUPLICATE`` if the address is already stored or
+        waiting in the queue, or ``BUSY`` if the queue is full.
+        """
+        with self._email_lock:
+            if email in self._pending_emails:
+                self._count('duplicates')
+                return DUPLICATE
+            self._pending_emails.add(email)
+        # Reads don't take the writer lock in WAL mode, so this lookup on the
+        # UNIQUE index stays cheap even while the writer is busy.
+        with self.pool.connection() as conn:
+            exists = conn.execute('SELECT 1 FROM newsletter WHERE email = ?', (email,)).fetchone()
+        if exists:
+            self._forget_emails([email])
+            self._count('duplicates')
+            return DUPLICATE
+        if not self.put((NEWSLETTER, (email,))):
+            self._forget_emails([email])
+            return BUSY
+        return QUEUED
+
+    def _forget_emails(self, emails):
+        with self._email_lock:
+            self._pending_emails.difference_update(emails)
+
+    def writer_session(self):
+        # The writer thread keeps one pooled connection for its lifetime
+        return self.pool.connection()
+
+    def write(self, batch):
+        rows = {CONTACT: [], NEWSLETTER: []}
+        for kind, params in batch:
+            rows[kind].append(params)
+        conn = self.pool.acquire()
+        with conn:
+            for kind, params in rows.items():
+                if params:
+                    conn.executemany(INSERT_SQL[kind], params)
+
+    def batch_done(self, batch):
+        self._forget_emails(params[0] for kind, params in batch if kind == NEWSLETTER)
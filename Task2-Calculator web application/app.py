@@ -1,14 +1,45 @@
 from flask import Flask, render_template, request, jsonify # pyright: ignore[reportMissingImports]
 import sqlite3
 import os
+import sys
 import math
+import threading
+import time
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.sqlite_pool import ConnectionPool  # noqa: E402
+import expr_engine  # noqa: E402
+import eval_pool  # noqa: E402
+import units  # noqa: E402
+import counters  # noqa: E402
+import retention  # noqa: E402
+
 app = Flask(__name__)
+app.config['MAX_BATCH_ITEMS'] = 10000
+# Single expressions run in isolated worker processes; 0 evaluates in-process
+app.config['EVAL_POOL_SIZE'] = int(os.environ.get('EVAL_POOL_SIZE', 2))
+app.config['EVAL_TIMEOUT_MS'] = int(os.environ.get('EVAL_TIMEOUT_MS', 500))
+app.config['EVAL_CPU_BUDGET'] = float(os.environ.get('EVAL_CPU_BUDGET', 1.0))
+app.config['EVAL_MAX_RESULT_DIGITS'] = int(os.environ.get('EVAL_MAX_RESULT_DIGITS', 1000))
+app.config['STATS_CACHE_TTL'] = 1.0
+app.config['HISTORY_PAGE_MAX'] = 500
+# History retention, 0 disables a limit; pruning runs in a background thread
+app.config['HISTORY_MAX_AGE_DAYS'] = int(os.environ.get('HISTORY_MAX_AGE_DAYS', 0))
+app.config['HISTORY_MAX_ROWS'] = int(os.environ.get('HISTORY_MAX_ROWS', 0))
+app.config['HISTORY_PRUNE_INTERVAL'] = float(os.environ.get('HISTORY_PRUNE_INTERVAL', 300))
+app.config['HISTORY_DELETE_CHUNK'] = int(os.environ.get('HISTORY_DELETE_CHUNK', 500))
 
 # Database setup
+DATABASE = 'calculator.db'
+pool = ConnectionPool(DATABASE, row_factory=None).init_app(app)
+
+def get_db():
+    """Get this thread's pooled database connection"""
+    return pool.acquire()
+
 def init_db():
-    conn = sqlite3.connect('calculator.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute('''
         CREATE TABLE IF NOT EXISTS calculations (
@@ -30,11 +61,86 @@ def init_db():
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    if counters.install(conn):
+        counters.rebuild(conn)
     conn.commit()
-    conn.close()
+
+_evaluator = None
+_evaluator_lock = threading.Lock()
+
+def get_evaluator():
+    """The evaluation worker pool, started on first use
+
+    Call this before serving (see ``__main__``) so the workers are forked
+    from a single-threaded process rather than from a request thread.
+    """
+    global _evaluator
+    if _evaluator is None and app.config['EVAL_POOL_SIZE'] > 0:
+        with _evaluator_lock:
+            if _evaluator is None:
+                _evaluator = eval_pool.EvalPool(
+                    size=app.config['EVAL_POOL_SIZE'],
+                    wall_timeout=app.config['EVAL_TIMEOUT_MS'] / 1000.0,
+                    cpu_budget=app.config['EVAL_CPU_BUDGET'],
+                    max_result_digits=app.config['EVAL_MAX_RESULT_DIGITS'],
+                ).start()
+    return _evaluator
+
+def result_text(result):
+    """A formatted result as text, refusing integers over EVAL_MAX_RESULT_DIGITS"""
+    if isinstance(result, int) and result.bit_length() > app.config['EVAL_MAX_RESULT_DIGITS'] * math.log2(10):
+        raise OverflowError('Result too large')
+    return str(result)
+
+_stats_cache = None
+_stats_lock = threading.Lock()
+
+def cached_statistics():
+    """History totals, re-read from the counters at most once per STATS_CACHE_TTL"""
+    global _stats_cache
+    now = time.monotonic()
+    with _stats_lock:
+        cached = _stats_cache
+    if cached and now - cached[1] < app.config['STATS_CACHE_TTL']:
+        return cached[0]
+    stats = counters.read(get_db())
+    with _stats_lock:
+        _stats_cache = (stats, now)
+    return stats
+
+def invalidate_statistics():
+    global _stats_cache
+    with _stats_lock:
+        _stats_cache = None
+
+pruner = None
+
+def start_retention():
+    """Start background history pruning if a retention limit is configured"""
+    global pruner
+    if pruner is None:
+        pruner = retention.RetentionPruner(
+            pool,
+            max_age_days=app.config['HISTORY_MAX_AGE_DAYS'],
+            max_rows=app.config['HISTORY_MAX_ROWS'],
+            interval=app.config['HISTORY_PRUNE_INTERVAL'],
+            chunk_size=app.config['HISTORY_DELETE_CHUNK'],
+            on_prune=invalidate_statistics,
+        ).start()
+    return pruner
+
+def history_page_args():
+    """(limit, before_id) from the query string"""
+    limit = max(1, min(request.args.get('limit', 20, type=int), app.config['HISTORY_PAGE_MAX']))
+    return limit, request.args.get('before_id', sys.maxsize, type=int)
+
+def next_before_id(rows, limit):
+    """Cursor for the next (older) page, None on the last page"""
+    return rows[-1][0] if len(rows) == limit else None
 
 # Initialize database on startup
-init_db()
+with app.app_context():
+    init_db()
 
 @app.route('/')
 def index():
@@ -52,191 +158,186 @@ def calculate():
         if not expression:
             return jsonify({'error': 'Empty expression'}), 400
         
-        # Process the expression
-        expr = expression
-        
-        # Replace mathematical symbols
-        expr = expr.replace('π', str(math.pi))
-        expr = expr.replace('×', '*')
-        expr = expr.replace('÷', '/')
-        expr = expr.replace('−', '-')
-        
-        # Handle percentage
-        import re
-        expr = re.sub(r'(\d+)%', r'(\1/100)', expr)
-        
-        # Handle square root
-        expr = re.sub(r'√\(([^)]+)\)', r'math.sqrt(\1)', expr)
-        
-        # Handle square
-        expr = re.sub(r'\(([^)]+)\)²', r'math.pow(\1,2)', expr)
-        
-        # Handle trigonometric functions
-        if angle_mode == 'deg':
-            expr = re.sub(r'sin\(([^)]+)\)', r'math.sin(math.radians(\1))', expr)
-            expr = re.sub(r'cos\(([^)]+)\)', r'math.cos(math.radians(\1))', expr)
-            expr = re.sub(r'tan\(([^)]+)\)', r'math.tan(math.radians(\1))', expr)
-            expr = re.sub(r'asin\(([^)]+)\)', r'math.degrees(math.asin(\1))', expr)
-            expr = re.sub(r'acos\(([^)]+)\)', r'math.degrees(math.acos(\1))', expr)
-            expr = re.sub(r'atan\(([^)]+)\)', r'math.degrees(math.atan(\1))', expr)
+        # Parsed once, by whichever process evaluates it (each has its own
+        # compile cache); syntax errors come back as EvaluationError
+        programmer = mode == 'programmer'
+        evaluator = get_evaluator()
+        if evaluator is not None:
+            result = evaluator.evaluate(expression, angle_mode, programmer)
         else:
-            expr = re.sub(r'sin\(([^)]+)\)', r'math.sin(\1)', expr)
-            expr = re.sub(r'cos\(([^)]+)\)', r'math.cos(\1)', expr)
-            expr = re.sub(r'tan\(([^)]+)\)', r'math.tan(\1)', expr)
-            expr = re.sub(r'asin\(([^)]+)\)', r'math.asin(\1)', expr)
-            expr = re.sub(r'acos\(([^)]+)\)', r'math.acos(\1)', expr)
-            expr = re.sub(r'atan\(([^)]+)\)', r'math.atan(\1)', expr)
-        
-        # Handle logarithms
-        expr = re.sub(r'log\(([^)]+)\)', r'math.log10(\1)', expr)
-        expr = re.sub(r'ln\(([^)]+)\)', r'math.log(\1)', expr)
-        
-        # Handle exponentials
-        expr = re.sub(r'e\^\(([^)]+)\)', r'math.exp(\1)', expr)
-        expr = re.sub(r'([0-9.]+)\^([0-9.]+)', r'math.pow(\1,\2)', expr)
-        
-        # Evaluate expression
-        result = eval(expr, {"__builtins__": None}, {"math": math})
-        
-        # Handle invalid results
-        if not math.isfinite(result):
-            return jsonify({'error': 'Math error'}), 400
-        
-        # Format result
-        if isinstance(result, float):
-            if result.is_integer():
-                result = int(result)
-            else:
-                result = round(result, 10)
+            result = expr_engine.evaluate(expression, angle_mode, programmer)
+            
+            # Handle invalid results
+            if isinstance(result, float) and not math.isfinite(result):
+                return jsonify({'error': 'Math error'}), 400
+            
+            # Format result
+            result = result_text(expr_engine.format_result(result))
         
         # Store in database
-        conn = sqlite3.connect('calculator.db')
+        conn = get_db()
         c = conn.cursor()
         c.execute('INSERT INTO calculations (expression, result, mode) VALUES (?, ?, ?)',
                   (expression, str(result), mode))
         conn.commit()
-        conn.close()
         
         return jsonify({'result': str(result)})
     
-    except ZeroDivisionError:
-        return jsonify({'error': 'Division by zero'}), 400
-    except ValueError as e:
-        return jsonify({'error': 'Math domain error'}), 400
-    except SyntaxError:
-        return jsonify({'error': 'Invalid syntax'}), 400
+    except eval_pool.EvaluationError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        # Same messages the worker pool and /calculate/batch report
+        return jsonify({'error': expr_engine.error_message(e)}), 400
+
+@app.route('/calculate/batch', methods=['POST'])
+def calculate_batch():
+    """Evaluate many expressions, or one expression over arrays of variables
+
+    Either ``{"expressions": ["1+2", "sin(30)"]}`` or
+    ``{"expression": "x^2+y", "variables": {"x": [1, 2], "y": [3, 4]}}``.
+    """
+    try:
+        data = request.get_json()
+        mode = data.get('mode', 'basic')
+        angle_mode = data.get('angleMode', 'deg')
+        programmer = mode == 'programmer'
+        max_items = app.config['MAX_BATCH_ITEMS']
+        
+        if 'expressions' in data:
+            expressions = data['expressions']
+            if not isinstance(expressions, list) or not expressions:
+                return jsonify({'error': 'expressions must be a non-empty list'}), 400
+            if len(expressions) > max_items:
+                return jsonify({'error': 'At most %d items per batch' % max_items}), 400
+            
+            results = []
+            for expression in expressions:
+                try:
+                    if not isinstance(expression, str) or not expression:
+                        raise SyntaxError('Empty expression')
+                    result = expr_engine.evaluate(expression, angle_mode, programmer)
+                    if isinstance(result, float) and not math.isfinite(result):
+                        results.append((expression, None, 'Math error'))
+                    else:
+                        results.append((expression, result_text(expr_engine.format_result(result)), None))
+                except Exception as e:
+                    results.append((expression, None, expr_engine.error_message(e)))
+        else:
+            expression = data.get('expression', '')
+            variables = data.get('variables') or {}
+            if not expression:
+                return jsonify({'error': 'Empty expression'}), 400
+            if not isinstance(variables, dict) or not all(isinstance(v, list) for v in variables.values()):
+                return jsonify({'error': 'variables must map names to lists'}), 400
+            if any(len(v) > max_items for v in variables.values()):
+                return jsonify({'error': 'At most %d items per batch' % max_items}), 400
+            
+            try:
+                evaluated = expr_engine.evaluate_vector(expression, variables, angle_mode, programmer)
+            except SyntaxError:
+                return jsonify({'error': 'Invalid syntax'}), 400
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            names = sorted(variables)
+            results = []
+            for i, (result, error) in enumerate(evaluated):
+                bound = ', '.join('%s=%s' % (name, variables[name][i]) for name in names)
+                if error is None:
+                    try:
+                        result = result_text(result)
+                    except OverflowError as e:
+                        result, error = None, expr_engine.error_message(e)
+                results.append(('%s [%s]' % (expression, bound) if bound else expression, result, error))
+        
+        # Record every successful item in one transaction
+        conn = get_db()
+        conn.executemany(
+            'INSERT INTO calculations (expression, result, mode) VALUES (?, ?, ?)',
+            [(expression, result, mode) for expression, result, error in results if error is None]
+        )
+        conn.commit()
+        
+        return jsonify({
+            'count': len(results),
+            'errors': sum(1 for r in results if r[2] is not None),
+            'results': [
+                {'expression': expression, 'error': error} if error is not None
+                else {'expression': expression, 'result': result}
+                for expression, result, error in results
+            ]
+        })
+    
     except Exception as e:
-        return jsonify({'error': 'Invalid expression'}), 400
+        return jsonify({'error': 'Invalid request'}), 400
 
 @app.route('/convert', methods=['POST'])
 def convert_units():
+    """Convert one ``value`` or a whole list of ``values`` between units"""
     try:
         data = request.get_json()
         conversion_type = data.get('type', '')
-        value = float(data.get('value', 0))
         from_unit = data.get('from_unit', '')
         to_unit = data.get('to_unit', '')
         
-        # Conversion factors
-        conversions = {
-            'length': {
-                'meter': 1,
-                'kilometer': 0.001,
-                'centimeter': 100,
-                'millimeter': 1000,
-                'mile': 0.000621371,
-                'yard': 1.09361,
-                'foot': 3.28084,
-                'inch': 39.3701
-            },
-            'weight': {
-                'kilogram': 1,
-                'gram': 1000,
-                'milligram': 1000000,
-                'pound': 2.20462,
-                'ounce': 35.274
-            },
-            'time': {
-                'second': 1,
-                'minute': 1/60,
-                'hour': 1/3600,
-                'day': 1/86400,
-                'week': 1/604800
-            }
-        }
-        
-        # Temperature conversion
-        if conversion_type == 'temperature':
-            if from_unit == 'celsius':
-                if to_unit == 'fahrenheit':
-                    result = value * 9/5 + 32
-                elif to_unit == 'kelvin':
-                    result = value + 273.15
-                else:
-                    result = value
-            elif from_unit == 'fahrenheit':
-                if to_unit == 'celsius':
-                    result = (value - 32) * 5/9
-                elif to_unit == 'kelvin':
-                    result = (value - 32) * 5/9 + 273.15
-                else:
-                    result = value
-            elif from_unit == 'kelvin':
-                if to_unit == 'celsius':
-                    result = value - 273.15
-                elif to_unit == 'fahrenheit':
-                    result = (value - 273.15) * 9/5 + 32
-                else:
-                    result = value
-            else:
-                result = value
+        if 'values' in data:
+            values = data['values']
+            if not isinstance(values, list) or not values:
+                return jsonify({'error': 'values must be a non-empty list'}), 400
+            if len(values) > app.config['MAX_BATCH_ITEMS']:
+                return jsonify({'error': 'At most %d items per batch' % app.config['MAX_BATCH_ITEMS']}), 400
+            values = [float(v) for v in values]
+            results = units.convert_many(conversion_type, values, from_unit, to_unit)
         else:
-            # Standard unit conversion
-            if conversion_type in conversions:
-                units = conversions[conversion_type]
-                base_value = value / units[from_unit]
-                result = base_value * units[to_unit]
-            else:
-                result = value
+            values = [float(data.get('value', 0))]
+            results = [units.convert(conversion_type, values[0], from_unit, to_unit)]
         
         # Store in database
-        conn = sqlite3.connect('calculator.db')
-        c = conn.cursor()
-        c.execute('''INSERT INTO conversions 
-                     (conversion_type, from_value, from_unit, to_value, to_unit) 
-                     VALUES (?, ?, ?, ?, ?)''',
-                  (conversion_type, value, from_unit, result, to_unit))
+        conn = get_db()
+        conn.executemany('''INSERT INTO conversions 
+                            (conversion_type, from_value, from_unit, to_value, to_unit) 
+                            VALUES (?, ?, ?, ?, ?)''',
+                         [(conversion_type, value, from_unit, result, to_unit)
+                          for value, result in zip(values, results)])
         conn.commit()
-        conn.close()
         
-        return jsonify({'result': round(result, 10)})
+        if 'values' in data:
+            return jsonify({'results': [round(r, 10) for r in results]})
+        return jsonify({'result': round(results[0], 10)})
     
+    except units.UnknownConversion as e:
+        return jsonify({'error': str(e)}), 400
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid value'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/history', methods=['GET'])
 def get_history():
     try:
-        limit = request.args.get('limit', 20, type=int)
-        conn = sqlite3.connect('calculator.db')
+        # Keyset paging: ?before_id= walks the primary key, no OFFSET scan
+        limit, before_id = history_page_args()
+        conn = get_db()
         c = conn.cursor()
-        c.execute('''SELECT expression, result, mode, timestamp 
+        c.execute('''SELECT id, expression, result, mode, timestamp 
                      FROM calculations 
+                     WHERE id < ?
                      ORDER BY id DESC 
-                     LIMIT ?''', (limit,))
+                     LIMIT ?''', (before_id, limit))
         history = c.fetchall()
-        conn.close()
         
         return jsonify({
             'history': [
                 {
-                    'expression': h[0], 
-                    'result': h[1], 
-                    'mode': h[2],
-                    'timestamp': h[3]
+                    'id': h[0],
+                    'expression': h[1], 
+                    'result': h[2], 
+                    'mode': h[3],
+                    'timestamp': h[4]
                 }
                 for h in history
-            ]
+            ],
+            'next_before_id': next_before_id(history, limit)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -244,29 +345,31 @@ def get_history():
 @app.route('/conversion-history', methods=['GET'])
 def get_conversion_history():
     try:
-        limit = request.args.get('limit', 20, type=int)
-        conn = sqlite3.connect('calculator.db')
+        limit, before_id = history_page_args()
+        conn = get_db()
         c = conn.cursor()
-        c.execute('''SELECT conversion_type, from_value, from_unit, 
+        c.execute('''SELECT id, conversion_type, from_value, from_unit, 
                             to_value, to_unit, timestamp 
                      FROM conversions 
+                     WHERE id < ?
                      ORDER BY id DESC 
-                     LIMIT ?''', (limit,))
+                     LIMIT ?''', (before_id, limit))
         history = c.fetchall()
-        conn.close()
         
         return jsonify({
             'history': [
                 {
-                    'type': h[0],
-                    'from_value': h[1],
-                    'from_unit': h[2],
-                    'to_value': h[3],
-                    'to_unit': h[4],
-                    'timestamp': h[5]
+                    'id': h[0],
+                    'type': h[1],
+                    'from_value': h[2],
+                    'from_unit': h[3],
+                    'to_value': h[4],
+                    'to_unit': h[5],
+                    'timestamp': h[6]
                 }
                 for h in history
-            ]
+            ],
+            'next_before_id': next_before_id(history, limit)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -275,51 +378,67 @@ def get_conversion_history():
 def clear_history():
     try:
         history_type = request.get_json().get('type', 'all')
-        conn = sqlite3.connect('calculator.db')
-        c = conn.cursor()
+        conn = get_db()
         
-        if history_type == 'calculations':
-            c.execute('DELETE FROM calculations')
-        elif history_type == 'conversions':
-            c.execute('DELETE FROM conversions')
+        if history_type in retention.HISTORY_TABLES:
+            tables = [history_type]
         else:
-            c.execute('DELETE FROM calculations')
-            c.execute('DELETE FROM conversions')
+            tables = retention.HISTORY_TABLES
         
-        conn.commit()
-        conn.close()
-        return jsonify({'message': 'History cleared'})
+        # Delete in short transactions so /calculate inserts aren't stalled
+        deleted = {}
+        for table in tables:
+            deleted[table] = retention.delete_through(conn, table, chunk_size=app.config['HISTORY_DELETE_CHUNK'])
+        
+        invalidate_statistics()
+        return jsonify({'message': 'History cleared', 'deleted': deleted})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/statistics', methods=['GET'])
 def get_statistics():
     try:
-        conn = sqlite3.connect('calculator.db')
-        c = conn.cursor()
-        
-        # Get calculation statistics
-        c.execute('SELECT COUNT(*) FROM calculations')
-        total_calculations = c.fetchone()[0]
-        
-        c.execute('SELECT COUNT(*) FROM conversions')
-        total_conversions = c.fetchone()[0]
-        
-        c.execute('''SELECT mode, COUNT(*) 
-                     FROM calculations 
-                     GROUP BY mode''')
-        mode_stats = dict(c.fetchall())
-        
-        conn.close()
-        
-        return jsonify({
-            'total_calculations': total_calculations,
-            'total_conversions': total_conversions,
-            'mode_statistics': mode_stats
-        })
+        # Totals are kept up to date by triggers (see counters.py)
+        return jsonify(cached_statistics())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/engine-stats', methods=['GET'])
+def engine_stats():
+    evaluator = get_evaluator()
+    return jsonify({
+        # This process: batches, and /calculate when the pool is off; the
+        # workers' caches are in eval_pool's cache_hits / cache_misses
+        'compile_cache': expr_engine.cache_stats(),
+        'eval_pool': evaluator.get_stats() if evaluator is not None else None
+    })
+
+@app.route('/db-stats', methods=['GET'])
+def db_stats():
+    stats = pool.get_stats()
+    if pruner is not None:
+        stats['retention'] = pruner.get_stats()
+    return jsonify(stats)
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recount the history counters from the history tables"""
+    with app.app_context():
+        counters.rebuild(get_db())
+        print(counters.read(get_db()))
+
+@app.cli.command('prune-history')
+def prune_history():
+    """Apply the history retention policy once"""
+    with app.app_context():
+        pruned = retention.prune(
+            get_db(),
+            max_age_days=app.config['HISTORY_MAX_AGE_DAYS'],
+            max_rows=app.config['HISTORY_MAX_ROWS'],
+            chunk_size=app.config['HISTORY_DELETE_CHUNK'],
+        )
+    print('Pruned %s' % pruned)
+
 @app.errorhandler(404)
 def not_found(e):
     return jsonify({'error': 'Not found'}), 404
@@ -329,4 +448,6 @@ def server_error(e):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
+    get_evaluator()
+    start_retention()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,277 @@
+"""Offline benchmarks for the calculator's evaluation and conversion paths
+
+Run from anywhere; nothing touches the network or the real calculator.db
+(the app is imported with a temporary working directory)::
+
+    python benchmarks/bench.py                      # all suites, table on stdout
+    python benchmarks/bench.py --quick              # fewer samples, for a smoke run
+    python benchmarks/bench.py --suite micro        # engine/units only
+    python benchmarks/bench.py --json base.json     # save the run
+    python benchmarks/bench.py --compare base.json  # diff against a saved run
+
+``--compare`` prints the p50/p99 change per benchmark and exits with
+status 1 if any p50 regressed by more than ``--threshold`` percent, so two
+commits can be compared by saving a run on each.
+
+Micro benchmarks time batches of calls and report the per-call cost;
+end-to-end benchmarks time every Flask test-client request individually.
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import corpus  # noqa: E402
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_samples) - 1, int(round(pct / 100.0 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def measure(fn, samples, inner=1, warmup=None):
+    """Time ``samples`` batches of ``inner`` calls, per-call seconds each"""
+    for _ in range(warmup if warmup is not None else max(1, samples // 10)):
+        fn()
+    timings = []
+    clock = time.perf_counter
+    for _ in range(samples):
+        start = clock()
+        for _ in range(inner):
+            fn()
+        timings.append((clock() - start) / inner)
+    return timings
+
+
+def summarize(timings, ops_per_call=1):
+    timings = sorted(t / ops_per_call for t in timings)
+    total = sum(timings)
+    return {
+        'samples': len(timings),
+        'p50_us': round(percentile(timings, 50) * 1e6, 3),
+        'p99_us': round(percentile(timings, 99) * 1e6, 3),
+        'mean_us': round(total / len(timings) * 1e6, 3),
+        'ops_per_s': round(len(timings) / total, 1) if total else None,
+    }
+
+
+def quietly(fn, *args, **kwargs):
+    """Call ``fn`` ignoring errors, so error paths can be timed too"""
+    def call():
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            pass
+    return call
+
+
+def over_corpus(fn, entries):
+    """One call = ``fn`` applied to every corpus entry"""
+    def call():
+        for name, expression, mode, angle_mode in entries:
+            try:
+                fn(expression, angle_mode, mode == 'programmer')
+            except Exception:
+                pass
+    return call
+
+
+# ==================== SUITES ====================
+
+def micro_suite(samples):
+    import expr_engine
+    import units
+
+    realistic = corpus.REALISTIC
+    uncached_compile = expr_engine.compile_expression.__wrapped__
+
+    def format_all(expression, angle_mode, programmer):
+        expr_engine.format_result(expr_engine.evaluate(expression, angle_mode, programmer))
+
+    results = {}
+    inner = 20
+    benches = [
+        ('tokenize', lambda e, a, p: expr_engine.tokenize(e)),
+        ('parse', lambda e, a, p: expr_engine.parse(e, bitwise_xor=p)),
+        ('compile', uncached_compile),
+        ('evaluate', expr_engine.evaluate),
+        ('evaluate+format', format_all),
+    ]
+    for stage, fn in benches:
+        timings = measure(over_corpus(fn, realistic), samples, inner)
+        results['micro/%s/realistic' % stage] = summarize(timings, len(realistic))
+
+    for name, expression, mode, angle_mode in corpus.ADVERSARIAL:
+        programmer = mode == 'programmer'
+        results['micro/parse/%s' % name] = summarize(
+            measure(quietly(expr_engine.parse, expression, bitwise_xor=programmer), samples, 2))
+        results['micro/evaluate/%s' % name] = summarize(
+            measure(quietly(expr_engine.evaluate, expression, angle_mode, programmer), samples, 2))
+
+    def convert_all():
+        for name, conversion_type, value, from_unit, to_unit in corpus.CONVERSIONS:
+            units.convert(conversion_type, value, from_unit, to_unit)
+
+    results['micro/convert/scalar'] = summarize(
+        measure(convert_all, samples, inner), len(corpus.CONVERSIONS))
+    values = corpus.batch_values(1000)
+    results['micro/convert_many/1000'] = summarize(
+        measure(lambda: units.convert_many('temperature', values, 'celsius', 'fahrenheit'), samples, 2))
+    return results
+
+
+def e2e_suite(samples, eval_pool_size):
+    # The app opens calculator.db relative to the working directory; keep
+    # the benchmark's writes in a throwaway directory.
+    workdir = tempfile.mkdtemp(prefix='calc-bench-')
+    atexit.register(shutil.rmtree, workdir, True)
+    os.chdir(workdir)
+    os.environ['EVAL_POOL_SIZE'] = str(eval_pool_size)
+    import app as calculator
+
+    client = calculator.app.test_client()
+
+    def cycle(payloads, path):
+        state = {'i': 0}
+
+        def call():
+            payload = payloads[state['i'] % len(payloads)]
+            state['i'] += 1
+            client.post(path, json=payload)
+        return call
+
+    def calc_payloads(entries):
+        return [{'expression': e, 'mode': m, 'angleMode': a} for _, e, m, a in entries]
+
+    results = {}
+    results['e2e/calculate/realistic'] = summarize(
+        measure(cycle(calc_payloads(corpus.REALISTIC), '/calculate'), samples))
+    results['e2e/calculate/adversarial'] = summarize(
+        measure(cycle(calc_payloads(corpus.ADVERSARIAL), '/calculate'), samples))
+
+    batch = {'expressions': [e for _, e, m, _ in corpus.REALISTIC if m != 'programmer'] * 5}
+    results['e2e/calculate_batch/%d' % len(batch['expressions'])] = summarize(
+        measure(cycle([batch], '/calculate/batch'), max(10, samples // 10)))
+    vector = {'expression': 'x^2+sin(x)', 'variables': {'x': corpus.batch_values(1000)}}
+    results['e2e/calculate_batch/vector1000'] = summarize(
+        measure(cycle([vector], '/calculate/batch'), max(10, samples // 10)))
+
+    conversions = [{'type': t, 'value': v, 'from_unit': f, 'to_unit': u}
+                   for _, t, v, f, u in corpus.CONVERSIONS]
+    results['e2e/convert/scalar'] = summarize(measure(cycle(conversions, '/convert'), samples))
+    many = {'type': 'temperature', 'values': corpus.batch_values(1000),
+            'from_unit': 'celsius', 'to_unit': 'kelvin'}
+    results['e2e/convert/values1000'] = summarize(
+        measure(cycle([many], '/convert'), max(10, samples // 10)))
+
+    results['e2e/statistics'] = summarize(measure(lambda: client.get('/statistics'), samples))
+    results['e2e/history'] = summarize(measure(lambda: client.get('/history?limit=20'), samples))
+    return results
+
+
+# ==================== REPORTING ====================
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def metadata(args):
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': numpy_version,
+        'eval_pool_size': args.eval_pool,
+        'samples': args.samples,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def print_table(results):
+    width = max(len(name) for name in results)
+    print('%-*s %12s %12s %12s %12s' % (width, 'benchmark', 'p50 us', 'p99 us', 'mean us', 'ops/s'))
+    for name, r in results.items():
+        print('%-*s %12.3f %12.3f %12.3f %12s' % (
+            width, name, r['p50_us'], r['p99_us'], r['mean_us'], r['ops_per_s']))
+
+
+def compare(results, baseline, threshold):
+    """Print per-benchmark changes, return the names that regressed"""
+    regressions = []
+    width = max(len(name) for name in results)
+    print('\n%-*s %10s %10s' % (width, 'vs ' + (baseline['meta'].get('revision') or 'baseline'), 'p50', 'p99'))
+    for name, r in results.items():
+        base = baseline['results'].get(name)
+        if not base:
+            print('%-*s %10s' % (width, name, 'new'))
+            continue
+        p50 = (r['p50_us'] / base['p50_us'] - 1) * 100 if base['p50_us'] else 0.0
+        p99 = (r['p99_us'] / base['p99_us'] - 1) * 100 if base['p99_us'] else 0.0
+        flag = '  REGRESSION' if p50 > threshold else ''
+        if flag:
+            regressions.append(name)
+        print('%-*s %+9.1f%% %+9.1f%%%s' % (width, name, p50, p99, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--suite', choices=('all', 'micro', 'e2e'), default='all')
+    parser.add_argument('--samples', type=int, default=500, help='timed samples per benchmark')
+    parser.add_argument('--quick', action='store_true', help='50 samples per benchmark')
+    parser.add_argument('--eval-pool', type=int, default=2,
+                        help='EVAL_POOL_SIZE for the end-to-end suite (0 = in-process)')
+    parser.add_argument('--json', metavar='PATH', help='write results to PATH')
+    parser.add_argument('--compare', metavar='PATH', help='compare with a saved run')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='p50 slowdown (percent) reported as a regression')
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.samples = 50
+    # The end-to-end suite changes directory; resolve paths first
+    json_path = args.json and os.path.abspath(args.json)
+    compare_path = args.compare and os.path.abspath(args.compare)
+
+    results = {}
+    if args.suite in ('all', 'micro'):
+        results.update(micro_suite(args.samples))
+    if args.suite in ('all', 'e2e'):
+        results.update(e2e_suite(args.samples, args.eval_pool))
+
+    print_table(results)
+    run = {'meta': metadata(args), 'results': results}
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(run, f, indent=2, sort_keys=True)
+    if compare_path:
+        with open(compare_path) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
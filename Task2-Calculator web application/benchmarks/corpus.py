@@ -0,0 +1,66 @@
+"""Fixed benchmark inputs for the calculator
+
+Every entry is ``(name, expression, mode, angle_mode)``.  The corpus is
+deterministic so results from different commits are comparable; change it
+only together with a note in the commit, since it resets the baseline.
+"""
+
+REALISTIC = [
+    ('add', '12+7', 'basic', 'deg'),
+    ('mixed', '3+4*2/(1-5)', 'basic', 'deg'),
+    ('decimals', '0.1+0.2*3.75-1.125', 'basic', 'deg'),
+    ('unicode_ops', '7×8÷2−3', 'basic', 'deg'),
+    ('percent', '250*15%', 'basic', 'deg'),
+    ('percent_chain', '80+80*12.5%-5%', 'basic', 'deg'),
+    ('sin_deg', 'sin(30)+cos(60)', 'scientific', 'deg'),
+    ('tan_deg', 'tan(45)*2', 'scientific', 'deg'),
+    ('sin_rad', 'sin(π/6)+cos(π/3)', 'scientific', 'rad'),
+    ('inverse_trig', 'asin(0.5)+acos(0.5)+atan(1)', 'scientific', 'deg'),
+    ('logs', 'log(1000)+ln(e^2)', 'scientific', 'deg'),
+    ('sqrt', '√(144)+sqrt(2)^2', 'scientific', 'deg'),
+    ('square', '12²+5²', 'scientific', 'deg'),
+    ('implicit_mul', '2π(3+4)', 'scientific', 'deg'),
+    ('power', '2^10+3^4', 'scientific', 'deg'),
+    ('sci_notation', '6.022e23*1.5e-3', 'scientific', 'deg'),
+    ('hex_and', '0xFF&0x0F', 'programmer', 'deg'),
+    ('xor_shift', '(0b1010^0b0110)<<4', 'programmer', 'deg'),
+    ('octal_or', '0o755|0o022', 'programmer', 'deg'),
+]
+
+ADVERSARIAL = [
+    ('deep_nesting', '(' * 100 + '1+2' + ')' * 100, 'basic', 'deg'),
+    ('deep_unary', '-' * 200 + '1', 'basic', 'deg'),
+    ('long_sum', '+'.join(str(i) for i in range(1, 250)), 'basic', 'deg'),
+    ('long_product', '*'.join(['1.0001'] * 140), 'basic', 'deg'),
+    ('nested_trig', 'sin(' * 40 + '1' + ')' * 40, 'scientific', 'rad'),
+    ('big_power', '2^8000', 'scientific', 'deg'),
+    ('power_tower', '2^2^2^2', 'scientific', 'deg'),
+    ('too_large', '9^9^9', 'scientific', 'deg'),
+    ('float_overflow', '1.5^5000', 'scientific', 'deg'),
+    ('domain_error', 'sqrt(-1)+ln(0)', 'scientific', 'deg'),
+    ('division_by_zero', '1/(3-3)', 'basic', 'deg'),
+    ('syntax_error', '3+*4)', 'basic', 'deg'),
+    ('too_long', '1+' * 600 + '1', 'basic', 'deg'),
+]
+
+CORPUS = REALISTIC + ADVERSARIAL
+
+# (name, conversion_type, value, from_unit, to_unit)
+CONVERSIONS = [
+    ('length', 'length', 42.195, 'kilometer', 'mile'),
+    ('inches', 'length', 72, 'inch', 'centimeter'),
+    ('weight', 'weight', 180, 'pound', 'kilogram'),
+    ('time', 'time', 3, 'week', 'minute'),
+    ('celsius', 'temperature', 37, 'celsius', 'fahrenheit'),
+    ('kelvin', 'temperature', -40, 'fahrenheit', 'kelvin'),
+]
+
+
+def batch_values(count, seed=1234):
+    """Deterministic pseudo-random values for batch conversions"""
+    values = []
+    state = seed
+    for _ in range(count):
+        state = (state * 1103515245 + 12345) % 2 ** 31
+        values.append(round(state / 2 ** 31 * 1000 - 500, 3))
+    return values
@@ -0,0 +1,90 @@
+"""History counters maintained by triggers
+
+``/statistics`` used to run two ``COUNT(*)`` scans and a ``GROUP BY mode``
+over the whole history on every poll.  ``history_counters`` holds one row
+per total (``calculations``, ``conversions``) and per calculator mode
+(``mode:basic``, ...), and triggers on the history tables adjust them in
+the same transaction as every insert and delete -- single inserts, the
+batch endpoint's executemany, clears and retention pruning alike -- so
+reading the statistics is a lookup of a handful of rows.
+"""
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS history_counters (
+        name TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS calculations_count_insert AFTER INSERT ON calculations BEGIN
+        INSERT INTO history_counters (name, count) VALUES ('calculations', 1)
+        ON CONFLICT (name) DO UPDATE SET count = count + 1;
+        INSERT INTO history_counters (name, count) VALUES ('mode:' || IFNULL(new.mode, 'basic'), 1)
+        ON CONFLICT (name) DO UPDATE SET count = count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS calculations_count_delete AFTER DELETE ON calculations BEGIN
+        UPDATE history_counters SET count = count - 1 WHERE name = 'calculations';
+        UPDATE history_counters SET count = count - 1 WHERE name = 'mode:' || IFNULL(old.mode, 'basic');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS calculations_count_update AFTER UPDATE OF mode ON calculations BEGIN
+        UPDATE history_counters SET count = count - 1 WHERE name = 'mode:' || IFNULL(old.mode, 'basic');
+        INSERT INTO history_counters (name, count) VALUES ('mode:' || IFNULL(new.mode, 'basic'), 1)
+        ON CONFLICT (name) DO UPDATE SET count = count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS conversions_count_insert AFTER INSERT ON conversions BEGIN
+        INSERT INTO history_counters (name, count) VALUES ('conversions', 1)
+        ON CONFLICT (name) DO UPDATE SET count = count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS conversions_count_delete AFTER DELETE ON conversions BEGIN
+        UPDATE history_counters SET count = count - 1 WHERE name = 'conversions';
+    END
+    ''',
+]
+
+
+def install(db):
+    """Create the counters table and triggers, True if they were just created"""
+    existed = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_counters'"
+    ).fetchone()
+    for statement in SCHEMA:
+        db.execute(statement)
+    return not existed
+
+
+def rebuild(db):
+    """Recount from the history tables (backfill after install, or repair)"""
+    db.execute('DELETE FROM history_counters')
+    db.execute("INSERT INTO history_counters (name, count) SELECT 'calculations', COUNT(*) FROM calculations")
+    db.execute("INSERT INTO history_counters (name, count) SELECT 'conversions', COUNT(*) FROM conversions")
+    db.execute('''
+        INSERT INTO history_counters (name, count)
+        SELECT 'mode:' || IFNULL(mode, 'basic'), COUNT(*) FROM calculations GROUP BY 1
+    ''')
+    db.commit()
+
+
+def read(db):
+    """Current totals in the /statistics response shape"""
+    totals = {'calculations': 0, 'conversions': 0}
+    modes = {}
+    for name, count in db.execute('SELECT name, count FROM history_counters'):
+        if name.startswith('mode:'):
+            if count:
+                modes[name[5:]] = count
+        else:
+            totals[name] = count
+    return {
+        'total_calculations': totals['calculations'],
+        'total_conversions': totals['conversions'],
+        'mode_statistics': modes
+    }
@@ -0,0 +1,274 @@
+"""Isolated worker processes for evaluating calculator expressions
+
+A single hostile expression used to pin a request thread for as long as the
+arithmetic took.  ``EvalPool`` keeps a few pre-started worker processes and
+hands each expression to an idle one with a budget:
+
+* wall clock -- the request stops waiting after ``wall_timeout`` seconds
+  and the worker is killed (a long C-level computation can't be
+  interrupted any other way) and replaced;
+* CPU -- before each task the worker lowers its own RLIMIT_CPU to the CPU
+  time used so far plus ``cpu_budget``, so the kernel kills it if it
+  overruns even when nobody is waiting for it;
+* result size -- integer results longer than ``max_result_digits`` are
+  refused in the worker instead of being pickled back.
+
+Each worker parses with its own compile cache; every reply says whether
+the compiled form came from that cache, and the pool reports the combined
+hit rate.  Workers are also recycled after ``max_tasks`` evaluations.  When every
+worker is busy for ``acquire_timeout`` seconds the caller gets ``PoolBusy``
+rather than queueing without bound.
+"""
+import atexit
+import math
+import multiprocessing
+import queue
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows, wall-clock budget only
+    resource = None
+
+
+class EvaluationError(Exception):
+    """Evaluation failed; ``message`` is safe to show to the user"""
+
+    status = 400
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class EvaluationTimeout(EvaluationError):
+    pass
+
+
+class PoolBusy(EvaluationError):
+    status = 503
+
+
+def _cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _worker_main(conn, cpu_budget, max_result_digits):
+    """Worker loop: receive (expression, angle_mode, programmer), send reply"""
+    import expr_engine
+
+    max_result_bits = int(max_result_digits * math.log2(10))
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        expression, angle_mode, programmer = task
+
+        if resource is not None:
+            _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            soft = int(_cpu_seconds() + cpu_budget) + 1
+            if hard == resource.RLIM_INFINITY or soft <= hard:
+                resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+        started = time.process_time()
+        hits = expr_engine.compile_expression.cache_info().hits
+        try:
+            result = expr_engine.evaluate(expression, angle_mode, programmer)
+            if isinstance(result, float) and not math.isfinite(result):
+                reply = ('error', 'Math error')
+            else:
+                result = expr_engine.format_result(result)
+                if isinstance(result, int) and result.bit_length() > max_result_bits:
+                    reply = ('error', 'Result too large')
+                else:
+                    reply = ('ok', result)
+        except Exception as e:
+            reply = ('error', expr_engine.error_message(e))
+        cached = expr_engine.compile_expression.cache_info().hits > hits
+        conn.send((reply, time.process_time() - started, cached))
+
+
+class _Worker:
+    __slots__ = ('process', 'conn', 'tasks')
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.tasks = 0
+
+
+class EvalPool:
+    """Fixed-size pool of expression-evaluating processes with budgets"""
+
+    def __init__(self, size=2, wall_timeout=0.5, cpu_budget=1.0, max_result_digits=1000,
+                 max_tasks=5000, acquire_timeout=0.5):
+        self.size = size
+        self.wall_timeout = wall_timeout
+        self.cpu_budget = cpu_budget
+        self.max_result_digits = max_result_digits
+        self.max_tasks = max_tasks
+        self.acquire_timeout = acquire_timeout
+        # Forked workers start in milliseconds and don't re-import app.py;
+        # the child only touches its pipe and expr_engine, never the
+        # parent's locks or database connections.  spawn where fork is
+        # unavailable (Windows).
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._ctx = multiprocessing.get_context(method)
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._missing = 0  # slots whose replacement worker failed to start
+        self._stats = {'tasks': 0, 'errors': 0, 'timeouts': 0, 'crashes': 0,
+                       'recycled': 0, 'busy': 0, 'spawn_failures': 0, 'cpu_seconds': 0.0,
+                       'cache_hits': 0, 'cache_misses': 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _spawn(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.cpu_budget, self.max_result_digits),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+        atexit.register(self.shutdown)
+        return self
+
+    def _retire(self, worker, graceful=False):
+        if graceful:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.process.join(0.1)
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(1)
+        worker.conn.close()
+
+    def _replace(self, worker, graceful=False):
+        """Retire a worker and start its successor, None if that fails"""
+        self._retire(worker, graceful)
+        try:
+            return self._spawn()
+        except OSError:
+            self._count('spawn_failures')
+            return None
+
+    def _release(self, worker):
+        """Return a live worker to the idle queue; otherwise free its slot"""
+        if worker is not None and worker.process.is_alive():
+            self._idle.put(worker)
+            return
+        if worker is not None:
+            self._retire(worker)
+        with self._lock:
+            self._missing += 1
+
+    def _refill(self):
+        """Try again to start workers for slots freed by failed spawns"""
+        with self._lock:
+            missing, self._missing = self._missing, 0
+        for _ in range(missing):
+            try:
+                self._idle.put(self._spawn())
+            except OSError:
+                self._count('spawn_failures')
+                with self._lock:
+                    self._missing += 1
+
+    def evaluate(self, expression, angle_mode='deg', programmer=False):
+        """Evaluate in a worker, returning the formatted result
+
+        Raises ``EvaluationError`` (or a subclass) with a user-facing message.
+        """
+        if not self._started:
+            self.start()
+        if self._missing:
+            self._refill()
+        try:
+            worker = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            self._count('busy')
+            raise PoolBusy('Server busy, please try again')
+        if not worker.process.is_alive():
+            # Died while idle (killed from outside)
+            self._count('crashes')
+            worker = self._replace(worker)
+            if worker is None:
+                self._release(None)
+                raise PoolBusy('Server busy, please try again')
+
+        replacement = worker
+        try:
+            worker.conn.send((expression, angle_mode, programmer))
+            if not worker.conn.poll(self.wall_timeout):
+                self._count('timeouts')
+                replacement = self._replace(worker)
+                raise EvaluationTimeout('Evaluation took too long')
+            try:
+                (status, value), cpu, cached = worker.conn.recv()
+            except (EOFError, OSError):
+                # Killed by the kernel for exceeding its CPU budget
+                self._count('crashes')
+                replacement = self._replace(worker)
+                raise EvaluationError('Evaluation exceeded its CPU budget')
+
+            self._count('tasks')
+            self._count('cpu_seconds', cpu)
+            self._count('cache_hits' if cached else 'cache_misses')
+            worker.tasks += 1
+            if worker.tasks >= self.max_tasks:
+                self._count('recycled')
+                replacement = self._replace(worker, graceful=True)
+            if status == 'error':
+                self._count('errors')
+                raise EvaluationError(value)
+            return value
+        finally:
+            self._release(replacement)
+
+    def shutdown(self):
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(worker, graceful=True)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['cpu_seconds'] = round(stats['cpu_seconds'], 4)
+        lookups = stats['cache_hits'] + stats['cache_misses']
+        stats['cache_hit_rate'] = round(stats['cache_hits'] / lookups, 4) if lookups else 0.0
+        stats.update({
+            'size': self.size,
+            'idle': self._idle.qsize(),
+            'missing': self._missing,
+            'wall_timeout_ms': int(self.wall_timeout * 1000),
+            'cpu_budget_s': self.cpu_budget,
+        })
+        return stats
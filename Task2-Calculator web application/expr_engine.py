@@ -0,0 +1,474 @@
+"""Tokenizer, parser and closure compiler for calculator expressions
+
+Replaces the old chain of ``re.sub`` rewrites + ``eval``.  An expression is
+tokenized once, parsed by recursive descent into a small tuple AST and
+compiled into a tree of closures that call ``math`` functions directly.
+Compiled expressions are kept in an LRU cache keyed by the expression text
+and the options that change its meaning (angle mode, programmer mode), so
+a repeated expression costs one dict lookup plus the arithmetic.
+
+The same AST can also be compiled against NumPy ufuncs, which evaluates an
+expression with variables over whole arrays of bindings in one pass (see
+``evaluate_vector``).
+
+Grammar (lowest to highest precedence)::
+
+    expr     := bitor
+    bitor    := bitxor ('|' bitxor)*
+    bitxor   := bitand ('^' bitand)*            programmer mode only
+    bitand   := shift ('&' shift)*
+    shift    := additive (('<<' | '>>') additive)*
+    additive := term (('+' | '-') term)*
+    term     := unary (('*' | '/') unary | <implicit> unary)*   implicit: before a name, '(' or '√'
+    unary    := ('-' | '+' | '~' | '√') unary | power
+    power    := postfix (('^' | '**') unary)?   right associative
+    postfix  := primary ('%' | '²')*
+    primary  := NUMBER | CONSTANT | VARIABLE | FUNCTION '(' expr ')' | '(' expr ')'
+"""
+import math
+import operator
+import re
+from functools import lru_cache
+
+try:
+    import numpy as np  # pyright: ignore[reportMissingImports]
+except ImportError:  # optional, batch evaluation falls back to a scalar loop
+    np = None
+
+CACHE_SIZE = 2048
+MAX_EXPRESSION_LENGTH = 1000
+# Integer results beyond this many bits can't be printed anyway (Python's
+# default limit is 4300 decimal digits), so refuse to compute them
+MAX_INT_BITS = 14000
+# Parentheses, function calls, power towers and prefix operators nested
+# deeper than this are refused before they can reach the recursion limit
+MAX_NESTING_DEPTH = 100
+
+
+class ExpressionError(SyntaxError):
+    """The expression text could not be parsed"""
+
+
+class NestingError(ExpressionError):
+    """The expression nests deeper than MAX_NESTING_DEPTH"""
+
+
+# ==================== TOKENIZER ====================
+
+# Display symbols the frontend sends, mapped to their ASCII operators
+_SYMBOLS = {'×': '*', '÷': '/', '−': '-', 'π': 'pi'}
+
+_TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<number>0[xX][0-9a-fA-F]+|0[bB][01]+|0[oO][0-7]+
+      |(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*|π)
+  | (?P<op>\*\*|<<|>>|[-+*/^%()&|~√²×÷−])
+''', re.VERBOSE)
+
+
+def tokenize(text):
+    """Split an expression into (kind, value) tokens"""
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError('Expression too long')
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:
+            raise ExpressionError('Unexpected character %r' % text[pos])
+        pos = match.end()
+        kind = match.lastgroup
+        if kind == 'ws':
+            continue
+        value = match.group()
+        if kind == 'number':
+            if value[:2].lower() in ('0x', '0b', '0o'):
+                value = int(value, 0)
+            elif any(c in value for c in '.eE'):
+                value = float(value)
+            else:
+                value = int(value)
+        else:
+            value = _SYMBOLS.get(value, value)
+        tokens.append((kind, value))
+    return tokens
+
+
+# ==================== PARSER ====================
+
+CONSTANTS = {'pi': math.pi, 'e': math.e}
+FUNCTIONS = ('sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'log', 'ln', 'sqrt', 'exp', 'abs')
+
+_PRIMARY_START = {'(', '√'}
+
+# All binary operators below the power level are left associative
+_BINARY_PRECEDENCE = {
+    '|': 1,
+    '^': 2,
+    '&': 3,
+    '<<': 4, '>>': 4,
+    '+': 5, '-': 5,
+    '*': 6, '/': 6,
+}
+
+
+class _Parser:
+    def __init__(self, tokens, bitwise_xor, variables):
+        self.tokens = tokens
+        self.pos = 0
+        self.bitwise_xor = bitwise_xor
+        self.variables = variables
+        self.depth = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def accept(self, *ops):
+        kind, value = self.peek()
+        if kind == 'op' and value in ops:
+            self.pos += 1
+            return value
+        return None
+
+    def nested(self, parse, extra=1):
+        """Run a sub-parse ``extra`` levels deeper, within MAX_NESTING_DEPTH"""
+        self.depth += extra
+        try:
+            if self.depth > MAX_NESTING_DEPTH:
+                raise NestingError('Expression too deeply nested')
+            return parse()
+        finally:
+            self.depth -= extra
+
+    def expect(self, op):
+        if self.accept(op) is None:
+            raise ExpressionError('Expected %r' % op)
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError('Empty expression')
+        node = self.bitor()
+        if self.pos != len(self.tokens):
+            raise ExpressionError('Unexpected %r' % (self.peek()[1],))
+        return node
+
+    def _binary_op(self):
+        """The binary operator at the cursor and its precedence, or (None, 0)"""
+        kind, value = self.peek()
+        if kind == 'op':
+            if value in _BINARY_PRECEDENCE and (value != '^' or self.bitwise_xor):
+                return value, _BINARY_PRECEDENCE[value]
+            if value in _PRIMARY_START:
+                return '', _BINARY_PRECEDENCE['*']
+        elif kind == 'name':
+            return '', _BINARY_PRECEDENCE['*']
+        # A number right after an operand ("2 3", "1.2.3") is a syntax error,
+        # not an implicit product
+        return None, 0
+
+    def bitor(self, min_precedence=1):
+        """The expr..term rules, by precedence climbing
+
+        One loop instead of a function per level keeps each nested
+        parenthesis to a handful of stack frames.
+        """
+        node = self.unary()
+        while True:
+            op, precedence = self._binary_op()
+            if op is None or precedence < min_precedence:
+                return node
+            if op:
+                self.pos += 1
+            else:
+                op = '*'  # implicit multiplication: 2π, 3(4+1), 2sin(30)
+            node = ('bin', op, node, self.bitor(precedence + 1))
+
+    def unary(self):
+        # Prefix operators are collected in a loop rather than by recursion;
+        # '+' is dropped and pairs of '-' cancel, so "----1" stays flat
+        ops = []
+        while True:
+            op = self.accept('-', '+', '~', '√')
+            if op is None:
+                break
+            if op == '-' and ops and ops[-1] == '-':
+                ops.pop()
+            elif op != '+':
+                ops.append(op)
+        node = self.nested(self.power, len(ops)) if ops else self.power()
+        for op in reversed(ops):
+            if op == '√':
+                node = ('call', 'sqrt', node)
+            else:
+                node = ('neg', node) if op == '-' else ('inv', node)
+        return node
+
+    def power(self):
+        base = self.postfix()
+        ops = ('**',) if self.bitwise_xor else ('^', '**')
+        if self.accept(*ops) is not None:
+            return ('bin', '**', base, self.nested(self.unary))
+        return base
+
+    def postfix(self):
+        node = self.primary()
+        while True:
+            op = self.accept('%', '²')
+            if op is None:
+                return node
+            node = ('pct', node) if op == '%' else ('bin', '**', node, ('num', 2))
+
+    def primary(self):
+        kind, value = self.peek()
+        if kind == 'number':
+            self.pos += 1
+            return ('num', value)
+        if kind == 'name':
+            self.pos += 1
+            if value in FUNCTIONS:
+                self.expect('(')
+                arg = self.nested(self.bitor)
+                self.expect(')')
+                return ('call', value, arg)
+            if value in self.variables:
+                return ('var', value)
+            if value in CONSTANTS:
+                return ('num', CONSTANTS[value])
+            raise ExpressionError('Unknown name %r' % value)
+        if self.accept('(') is not None:
+            node = self.nested(self.bitor)
+            self.expect(')')
+            return node
+        raise ExpressionError('Unexpected %r' % (value,) if kind else 'Unexpected end of expression')
+
+
+def parse(text, bitwise_xor=False, variables=()):
+    """Parse expression text into a tuple AST
+
+    Names listed in ``variables`` become ``('var', name)`` nodes (they
+    shadow the constants ``pi`` and ``e``); any other unknown name is an
+    error.
+    """
+    return _Parser(tokenize(text), bitwise_xor, frozenset(variables)).parse()
+
+
+# ==================== COMPILER ====================
+
+def _power(base, exponent):
+    # Exact integer powers like the old eval path; math.pow otherwise so a
+    # negative base with a fractional exponent is a domain error, not complex
+    if isinstance(base, int) and isinstance(exponent, int) and exponent >= 0:
+        if exponent > 1 and (base.bit_length() - 1) * exponent > MAX_INT_BITS:
+            raise OverflowError('Result too large')
+        return base ** exponent
+    return math.pow(base, exponent)
+
+
+def _lshift(value, count):
+    if isinstance(value, int) and isinstance(count, int) and value.bit_length() + count > MAX_INT_BITS:
+        raise OverflowError('Result too large')
+    return operator.lshift(value, count)
+
+
+BINARY_OPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '**': _power,
+    '&': operator.and_,
+    '|': operator.or_,
+    '^': operator.xor,
+    '<<': _lshift,
+    '>>': operator.rshift,
+}
+
+
+def _math_functions(angle_mode):
+    functions = {
+        'log': math.log10,
+        'ln': math.log,
+        'sqrt': math.sqrt,
+        'exp': math.exp,
+        'abs': abs,
+    }
+    if angle_mode == 'deg':
+        functions.update({
+            'sin': lambda x: math.sin(math.radians(x)),
+            'cos': lambda x: math.cos(math.radians(x)),
+            'tan': lambda x: math.tan(math.radians(x)),
+            'asin': lambda x: math.degrees(math.asin(x)),
+            'acos': lambda x: math.degrees(math.acos(x)),
+            'atan': lambda x: math.degrees(math.atan(x)),
+        })
+    else:
+        functions.update({name: getattr(math, name) for name in ('sin', 'cos', 'tan', 'asin', 'acos', 'atan')})
+    return functions
+
+
+MATH_FUNCTIONS = {mode: _math_functions(mode) for mode in ('deg', 'rad')}
+
+
+def _numpy_functions(angle_mode):
+    functions = {
+        'log': np.log10,
+        'ln': np.log,
+        'sqrt': np.sqrt,
+        'exp': np.exp,
+        'abs': np.abs,
+    }
+    if angle_mode == 'deg':
+        functions.update({
+            'sin': lambda x: np.sin(np.radians(x)),
+            'cos': lambda x: np.cos(np.radians(x)),
+            'tan': lambda x: np.tan(np.radians(x)),
+            'asin': lambda x: np.degrees(np.arcsin(x)),
+            'acos': lambda x: np.degrees(np.arccos(x)),
+            'atan': lambda x: np.degrees(np.arctan(x)),
+        })
+    else:
+        functions.update({
+            'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+            'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan,
+        })
+    return functions
+
+
+if np is not None:
+    NUMPY_FUNCTIONS = {mode: _numpy_functions(mode) for mode in ('deg', 'rad')}
+    NUMPY_BINARY_OPS = dict(BINARY_OPS, **{'**': np.power})
+
+
+def compile_node(node, functions, binary_ops=BINARY_OPS):
+    """Turn an AST node into a closure taking the variable bindings"""
+    kind = node[0]
+    if kind == 'num':
+        value = node[1]
+        return lambda env: value
+    if kind == 'var':
+        name = node[1]
+        return lambda env: env[name]
+    if kind == 'bin':
+        fn = binary_ops[node[1]]
+        left = compile_node(node[2], functions, binary_ops)
+        right = compile_node(node[3], functions, binary_ops)
+        return lambda env: fn(left(env), right(env))
+    if kind == 'neg':
+        operand = compile_node(node[1], functions, binary_ops)
+        return lambda env: -operand(env)
+    if kind == 'inv':
+        operand = compile_node(node[1], functions, binary_ops)
+        return lambda env: ~operand(env)
+    if kind == 'pct':
+        operand = compile_node(node[1], functions, binary_ops)
+        return lambda env: operand(env) / 100
+    if kind == 'call':
+        fn = functions[node[1]]
+        arg = compile_node(node[2], functions, binary_ops)
+        return lambda env: fn(arg(env))
+    raise ExpressionError('Unknown node %r' % (kind,))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(expression, angle_mode='deg', programmer=False, variables=(), vector=False):
+    """Parse and compile an expression (cached)
+
+    In programmer mode ``^`` is XOR, as on the frontend's programmer
+    keypad; everywhere else it is exponentiation.  ``variables`` must be a
+    sorted tuple so equivalent calls share a cache slot.  With ``vector``
+    the closures call NumPy ufuncs and accept arrays as bindings.
+    """
+    angle_mode = 'rad' if angle_mode == 'rad' else 'deg'
+    node = parse(expression, bitwise_xor=programmer, variables=variables)
+    if vector:
+        return compile_node(node, NUMPY_FUNCTIONS[angle_mode], NUMPY_BINARY_OPS)
+    return compile_node(node, MATH_FUNCTIONS[angle_mode])
+
+
+def evaluate(expression, angle_mode='deg', programmer=False, env=None):
+    """Compile (or fetch from cache) and evaluate an expression"""
+    env = env or {}
+    return compile_expression(expression, angle_mode, programmer, tuple(sorted(env)))(env)
+
+
+def evaluate_vector(expression, bindings, angle_mode='deg', programmer=False):
+    """Evaluate one expression over equal-length arrays of variable values
+
+    Returns a list with one ``(result, None)`` or ``(None, error)`` per
+    position.  The whole array is computed in one NumPy pass; positions
+    that come out non-finite, and every position when the expression can't
+    be vectorized (bitwise operators, no NumPy), are re-evaluated with the
+    scalar path so their errors read exactly like ``/calculate``'s.
+    """
+    names = tuple(sorted(bindings))
+    size = len(next(iter(bindings.values()))) if bindings else 1
+    if any(len(values) != size for values in bindings.values()):
+        raise ValueError('All variable arrays must have the same length')
+
+    values = None
+    if np is not None:
+        try:
+            fn = compile_expression(expression, angle_mode, programmer, names, vector=True)
+            arrays = {name: np.asarray(bindings[name], dtype=np.float64) for name in names}
+            with np.errstate(all='ignore'):
+                values = np.broadcast_to(np.asarray(fn(arrays), dtype=np.float64), (size,))
+        except ExpressionError:
+            raise
+        except (TypeError, ValueError, OverflowError, ZeroDivisionError):
+            values = None
+
+    if values is not None:
+        finite = np.isfinite(values).tolist()
+        values = values.tolist()
+    results = []
+    for i in range(size):
+        if values is not None and finite[i]:
+            results.append((format_result(values[i]), None))
+            continue
+        env = {name: bindings[name][i] for name in names}
+        try:
+            result = evaluate(expression, angle_mode, programmer, env)
+            if isinstance(result, float) and not math.isfinite(result):
+                results.append((None, 'Math error'))
+            else:
+                results.append((format_result(result), None))
+        except Exception as e:
+            results.append((None, error_message(e)))
+    return results
+
+
+def error_message(exc):
+    """The user-facing message /calculate reports for an evaluation error"""
+    if isinstance(exc, (NestingError, RecursionError)):
+        return 'Expression too deeply nested'
+    if isinstance(exc, ZeroDivisionError):
+        return 'Division by zero'
+    if isinstance(exc, ValueError):
+        return 'Math domain error'
+    if isinstance(exc, SyntaxError):
+        return 'Invalid syntax'
+    if isinstance(exc, OverflowError):
+        return 'Result too large'
+    return 'Invalid expression'
+
+
+def format_result(result):
+    """Integers as-is, floats rounded to 10 places with integral values as int"""
+    if isinstance(result, float):
+        result = round(result, 10)
+        if result.is_integer():
+            return int(result)
+    return result
+
+
+def cache_stats():
+    info = compile_expression.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'max_size': info.maxsize,
+        'hit_rate': round(info.hits / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,146 @@
+"""Chunked deletes and background retention for calculator history
+
+A single ``DELETE FROM calculations`` holds SQLite's writer lock until every
+row (and every counter trigger) is processed, and ``/calculate`` inserts
+queue behind it.  ``delete_through`` instead removes rows oldest-first in
+small transactions of ``chunk_size`` rows, committing and pausing between
+them so waiting writers get the lock every few milliseconds.
+
+The upper bound is an id fixed when the delete starts: rows inserted while
+it runs are newer than the clear and survive it.
+
+``RetentionPruner`` runs the same chunked delete from a background thread
+to keep each history table within an age and/or row-count limit.
+"""
+import atexit
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLES = ('calculations', 'conversions')
+
+
+def delete_through(db, table, last_id=None, chunk_size=500, pause=0.002):
+    """Delete rows with id <= ``last_id`` (default: all current rows) in chunks
+
+    Returns the number of rows deleted.
+    """
+    if table not in HISTORY_TABLES:
+        raise ValueError('Unknown history table: %s' % table)
+    if last_id is None:
+        last_id = db.execute('SELECT MAX(id) FROM %s' % table).fetchone()[0]
+        if last_id is None:
+            return 0
+    deleted = 0
+    while True:
+        cursor = db.execute(
+            'DELETE FROM %s WHERE id IN (SELECT id FROM %s WHERE id <= ? ORDER BY id LIMIT ?)'
+            % (table, table),
+            (last_id, chunk_size)
+        )
+        db.commit()
+        deleted += cursor.rowcount
+        if cursor.rowcount < chunk_size:
+            return deleted
+        time.sleep(pause)
+
+
+def expired_through(db, table, max_age_days=0, max_rows=0):
+    """Highest id that falls outside the retention policy, or None
+
+    Ids grow with time, so the age cut-off is the id just before the first
+    row young enough to keep; finding it only walks the expired rows.
+    """
+    bounds = []
+    if max_age_days:
+        row = db.execute(
+            "SELECT id FROM %s WHERE timestamp >= datetime('now', ?) ORDER BY id LIMIT 1" % table,
+            ('-%d days' % max_age_days,)
+        ).fetchone()
+        if row is None:
+            bounds.append(db.execute('SELECT MAX(id) FROM %s' % table).fetchone()[0])
+        else:
+            bounds.append(row[0] - 1)
+    if max_rows:
+        row = db.execute(
+            'SELECT id FROM %s ORDER BY id DESC LIMIT 1 OFFSET ?' % table, (max_rows,)
+        ).fetchone()
+        if row is not None:
+            bounds.append(row[0])
+    bounds = [b for b in bounds if b is not None]
+    return max(bounds) if bounds else None
+
+
+def prune(db, max_age_days=0, max_rows=0, chunk_size=500, pause=0.002):
+    """Apply the retention policy to every history table, {table: deleted}"""
+    pruned = {}
+    for table in HISTORY_TABLES:
+        last_id = expired_through(db, table, max_age_days, max_rows)
+        pruned[table] = delete_through(db, table, last_id, chunk_size, pause) if last_id else 0
+    return pruned
+
+
+class RetentionPruner:
+    """Background thread that prunes history every ``interval`` seconds"""
+
+    def __init__(self, pool, max_age_days=0, max_rows=0, interval=300.0,
+                 chunk_size=500, pause=0.002, on_prune=None):
+        self.pool = pool
+        self.max_age_days = max_age_days
+        self.max_rows = max_rows
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.on_prune = on_prune
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'runs': 0, 'rows_pruned': 0, 'failures': 0, 'last_run': None}
+
+    @property
+    def enabled(self):
+        return bool(self.max_age_days or self.max_rows)
+
+    def start(self):
+        if self._thread is None and self.enabled:
+            self._thread = threading.Thread(target=self._run, name='history-retention', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+        return self
+
+    def run_once(self):
+        with self.pool.connection() as db:
+            pruned = prune(db, self.max_age_days, self.max_rows, self.chunk_size, self.pause)
+        total = sum(pruned.values())
+        self._stats['runs'] += 1
+        self._stats['rows_pruned'] += total
+        self._stats['last_run'] = time.time()
+        if total and self.on_prune is not None:
+            self.on_prune()
+        return pruned
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                self._stats['failures'] += 1
+                logger.exception('History retention run failed')
+            self._stop.wait(self.interval)
+
+    def shutdown(self, timeout=5.0):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+
+    def get_stats(self):
+        stats = dict(self._stats)
+        stats.update({
+            'enabled': self.enabled,
+            'max_age_days': self.max_age_days,
+            'max_rows': self.max_rows,
+            'interval_s': self.interval,
+            'chunk_size': self.chunk_size,
+        })
+        return stats
@@ -0,0 +1,93 @@
+"""Unit conversion tables compiled into affine transforms
+
+Every unit is described once as an affine map onto its category's base
+unit (``base = value * scale + offset``).  At import time each (from, to)
+pair is folded into a single ``(scale, offset)`` so a conversion, including
+temperature, is one multiply-add, and an array of values converts in one
+NumPy expression.
+"""
+from fractions import Fraction
+
+try:
+    import numpy as np  # pyright: ignore[reportMissingImports]
+except ImportError:  # optional, batch conversion falls back to a list loop
+    np = None
+
+# Units per one base unit, as the frontend's converterUnits table
+_FACTORS = {
+    'length': {  # base: meter
+        'meter': 1,
+        'kilometer': 0.001,
+        'centimeter': 100,
+        'millimeter': 1000,
+        'mile': 0.000621371,
+        'yard': 1.09361,
+        'foot': 3.28084,
+        'inch': 39.3701
+    },
+    'weight': {  # base: kilogram
+        'kilogram': 1,
+        'gram': 1000,
+        'milligram': 1000000,
+        'pound': 2.20462,
+        'ounce': 35.274
+    },
+    'time': {  # base: second
+        'second': 1,
+        'minute': 1/60,
+        'hour': 1/3600,
+        'day': 1/86400,
+        'week': 1/604800
+    }
+}
+
+# unit -> (scale, offset) onto the base unit, kept exact as Fractions so
+# composing two units doesn't stack float rounding (F -> C -> F round-trips)
+UNITS = {
+    category: {unit: (1 / Fraction(factor), Fraction(0)) for unit, factor in factors.items()}
+    for category, factors in _FACTORS.items()
+}
+UNITS['temperature'] = {  # base: celsius
+    'celsius': (Fraction(1), Fraction(0)),
+    'fahrenheit': (Fraction(5, 9), Fraction(-160, 9)),
+    'kelvin': (Fraction(1), Fraction('-273.15')),
+}
+
+
+def _compile(units):
+    """Fold to-base and from-base into one float (scale, offset) per unit pair"""
+    table = {}
+    for category, members in units.items():
+        for src, (s1, o1) in members.items():
+            for dst, (s2, o2) in members.items():
+                # value * s1 + o1 = base = out * s2 + o2
+                table[(category, src, dst)] = (float(s1 / s2), float((o1 - o2) / s2))
+    return table
+
+
+TRANSFORMS = _compile(UNITS)
+
+
+class UnknownConversion(ValueError):
+    """The conversion type or one of the units is not supported"""
+
+
+def get_transform(conversion_type, from_unit, to_unit):
+    try:
+        return TRANSFORMS[(conversion_type, from_unit, to_unit)]
+    except KeyError:
+        raise UnknownConversion('Unsupported conversion: %s %s -> %s' % (conversion_type, from_unit, to_unit))
+
+
+def convert(conversion_type, value, from_unit, to_unit):
+    """Convert one value"""
+    scale, offset = get_transform(conversion_type, from_unit, to_unit)
+    return value * scale + offset
+
+
+def convert_many(conversion_type, values, from_unit, to_unit):
+    """Convert a list of values, vectorized when NumPy is available"""
+    scale, offset = get_transform(conversion_type, from_unit, to_unit)
+    if np is not None:
+        return (np.asarray(values, dtype=np.float64) * scale + offset).tolist()
+    return [float(v) * scale + offset for v in values]
@@ -0,0 +1,39 @@
+"""Append-only log of graded answers, written in batches
+
+Every answered question becomes one ``answer_event`` row for item
+analysis.  Answer requests only push the event onto a bounded in-process
+queue; one background writer (``shared.batch_writer.BatchWriter``) commits
+whole batches with ``executemany`` every ``batch_size`` events or every
+``flush_interval`` seconds, whichever comes first, so answering never
+waits on the SQLite writer lock.
+
+Events are analytics, not scores: when the queue is full, or a batch
+fails, the events are counted and dropped.
+"""
+from sqlalchemy.exc import OperationalError  # pyright: ignore[reportMissingImports]
+
+from shared.batch_writer import BatchWriter
+
+
+class AnswerLog(BatchWriter):
+    """Bounded event queue drained in batches by one writer thread
+
+    ``writer(rows)`` inserts a list of event dicts in one transaction.
+    """
+
+    name = 'answer-log'
+    retry_on = OperationalError
+
+    def __init__(self, writer, batch_size=500, flush_interval=1.0, max_pending=20000, max_retries=5):
+        super().__init__(batch_size=batch_size, flush_interval=flush_interval,
+                         max_pending=max_pending, max_retries=max_retries)
+        self.writer = writer
+
+    def append(self, event):
+        """Queue one event dict, False if it had to be dropped"""
+        if self._thread is None:
+            self.start()
+        return self.put(event)
+
+    def write(self, batch):
+        self.writer(batch)
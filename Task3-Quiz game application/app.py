@@ -1,17 +1,75 @@
-from flask import Flask, render_template, request, jsonify, session  # pyright: ignore[reportMissingImports]
+from flask import Flask, render_template, request, jsonify, session, g  # pyright: ignore[reportMissingImports]
 from flask_sqlalchemy import SQLAlchemy  # pyright: ignore[reportMissingImports]
 from flask_cors import CORS  # pyright: ignore[reportMissingModuleSource]
-from werkzeug.security import generate_password_hash, check_password_hash  # pyright: ignore[reportMissingImports]
 from datetime import datetime
+from functools import wraps
+import click  # pyright: ignore[reportMissingImports]
 import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.sqlite_pool import configure_sqlalchemy  # noqa: E402
+from shared.static_assets import AssetPipeline  # noqa: E402
+from shared.rate_limit import RateLimiter  # noqa: E402
+import question_cache  # noqa: E402
+import importer  # noqa: E402
+import leaderboard  # noqa: E402
+import password_hashing  # noqa: E402
+import user_cache  # noqa: E402
+import answer_log  # noqa: E402
+import item_analysis  # noqa: E402
+import quiz_sessions  # noqa: E402
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///codequiz.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Load every subject's questions into memory at startup
+app.config['QUESTION_CACHE_WARMUP'] = os.environ.get('QUESTION_CACHE_WARMUP', '1') == '1'
+app.config['QUIZ_MAX_QUESTIONS'] = 100
+# Seconds a started quiz can be answered and submitted; live quizzes kept in memory
+app.config['QUIZ_SESSION_TTL'] = float(os.environ.get('QUIZ_SESSION_TTL', 3600))
+app.config['QUIZ_SESSION_MAX'] = int(os.environ.get('QUIZ_SESSION_MAX', 100000))
+# Live quizzes per user; starting one more drops that user's oldest
+app.config['QUIZ_SESSION_PER_USER'] = int(os.environ.get('QUIZ_SESSION_PER_USER', 3))
+app.config['LEADERBOARD_SIZE'] = 10
+# Serve /api/user-stats from per-user/per-subject totals kept by submit_quiz
+app.config['USER_STATS_ROLLUP'] = os.environ.get('USER_STATS_ROLLUP', '1') == '1'
+# werkzeug method string; stored hashes made with other parameters are
+# upgraded on the next successful login
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+# Signed-in user profiles kept in memory; seconds before a cached profile is re-read
+app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 1024))
+app.config['USER_CACHE_TTL'] = float(os.environ.get('USER_CACHE_TTL', 300))
+# Answer events are committed in batches of up to this many rows
+app.config['ANSWER_LOG_BATCH_SIZE'] = int(os.environ.get('ANSWER_LOG_BATCH_SIZE', 500))
+# Answers a question needs before its difficulty is calibrated
+app.config['ANALYTICS_MIN_ANSWERS'] = int(os.environ.get('ANALYTICS_MIN_ANSWERS', 20))
+# Seconds between checks for question bank changes made by CLI commands
+app.config['BANK_VERSION_POLL'] = float(os.environ.get('BANK_VERSION_POLL', 5))
+# Keep a small set of long-lived connections instead of reconnecting per
+# request; pragmas (WAL, busy timeout, cache size) are applied on connect.
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 8,
+    'max_overflow': 8,
+    'connect_args': {'timeout': 5.0, 'cached_statements': 256, 'check_same_thread': False},
+}
 
 db = SQLAlchemy(app)
 CORS(app)
+assets = AssetPipeline(app)
+limiter = RateLimiter(app)
+hasher = password_hashing.PasswordHasher(
+    method=app.config['PASSWORD_HASH_METHOD'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+)
+
+with app.app_context():
+    pool_stats = configure_sqlalchemy(db.engine)
 
 # ==================== DATABASE MODELS ====================
 
@@ -41,6 +99,8 @@ class Question(db.Model):
     correct_answer = db.Column(db.Integer, nullable=False)  # 0=A, 1=B, 2=C, 3=D
     difficulty = db.Column(db.String(20), nullable=False)  # Easy, Medium, Hard
     explanation = db.Column(db.Text)
+    # Serves per-subject counts and the per-difficulty id lists for sampling
+    __table_args__ = (db.Index('ix_question_subject_difficulty', 'subject_id', 'difficulty'),)
 
 class QuizAttempt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -50,6 +110,373 @@ class QuizAttempt(db.Model):
     total_questions = db.Column(db.Integer, nullable=False)
     completed_at = db.Column(db.DateTime, default=datetime.utcnow)
     subject = db.relationship('Subject', backref='attempts')
+    __table_args__ = (
+        db.Index('ix_quiz_attempt_subject_score', 'subject_id', 'score'),
+        # Covers the per-user stats aggregate without touching the table
+        db.Index('ix_quiz_attempt_user_subject', 'user_id', 'subject_id', 'score'),
+    )
+
+class UserSubjectStats(db.Model):
+    """Running attempt totals per user and subject"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    best_score = db.Column(db.Integer, nullable=False, default=0)
+
+class LeaderboardEntry(db.Model):
+    """Materialized top-N attempt; scope is a subject id, 0 for the global board"""
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.Integer, nullable=False, index=True)
+    attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempt.id'), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    username = db.Column(db.String(80), nullable=False)
+    subject_id = db.Column(db.Integer, nullable=False)
+    subject = db.Column(db.String(100), nullable=False)
+    score = db.Column(db.Integer, nullable=False)
+    total_questions = db.Column(db.Integer, nullable=False)
+    completed_at = db.Column(db.DateTime, nullable=False)
+    __table_args__ = (db.UniqueConstraint('scope', 'attempt_id'),)
+
+class AnswerEvent(db.Model):
+    """One graded answer; rows are only ever appended"""
+    # Plain integer columns, no foreign keys or secondary indexes: the table
+    # is written in bulk and only ever read by full scans
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    subject_id = db.Column(db.Integer, nullable=False)
+    question_id = db.Column(db.Integer, nullable=False)
+    selected = db.Column(db.Integer, nullable=False)
+    correct = db.Column(db.Boolean, nullable=False)
+    time_ms = db.Column(db.Integer)
+    answered_at = db.Column(db.DateTime, nullable=False)
+
+class QuestionStats(db.Model):
+    """Item analysis results per question, replaced by each analytics run"""
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True)
+    answers = db.Column(db.Integer, nullable=False)
+    correct_rate = db.Column(db.Float)
+    discrimination = db.Column(db.Float)
+    time_p25_ms = db.Column(db.Integer)
+    time_p50_ms = db.Column(db.Integer)
+    time_p90_ms = db.Column(db.Integer)
+    calibrated_difficulty = db.Column(db.String(20))
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+class BankState(db.Model):
+    """Single row counting question bank changes across processes"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# ==================== QUESTION BANK CACHE ====================
+
+bank_version = question_cache.BankVersion().watch(db.session, (Subject, Question))
+
+def read_bank_state():
+    with db.engine.connect() as conn:
+        return conn.execute(db.select(BankState.version).where(BankState.id == 1)).scalar() or 0
+
+def publish_bank_change():
+    """Bump the bank version here and in the database, so running servers reload"""
+    with db.engine.begin() as conn:
+        bumped = conn.execute(db.update(BankState).where(BankState.id == 1).values(version=BankState.version + 1))
+        if not bumped.rowcount:
+            conn.execute(db.insert(BankState).values(id=1, version=1))
+    bank_version.bump()
+
+@app.before_request
+def check_bank_version():
+    bank_version.poll(read_bank_state, app.config['BANK_VERSION_POLL'])
+
+def load_subjects():
+    """Subjects with question counts from one grouped query"""
+    rows = db.session.query(
+        Subject.id,
+        Subject.name,
+        Subject.icon,
+        Subject.description,
+        db.func.count(Question.id)
+    ).outerjoin(Question).group_by(Subject.id).order_by(Subject.id).all()
+    return [{
+        'id': r[0],
+        'name': r[1],
+        'icon': r[2],
+        'description': r[3],
+        'question_count': r[4]
+    } for r in rows]
+
+subjects_cache = question_cache.SubjectListCache(bank_version, load_subjects)
+
+def question_rows():
+    """Query for question columns as plain rows, no ORM objects"""
+    return db.session.query(
+        Question.id,
+        Question.subject_id,
+        Question.question_text,
+        Question.option_a,
+        Question.option_b,
+        Question.option_c,
+        Question.option_d,
+        Question.correct_answer,
+        Question.difficulty,
+        Question.explanation,
+        QuestionStats.calibrated_difficulty
+    ).outerjoin(QuestionStats, QuestionStats.question_id == Question.id)
+
+def to_record(r):
+    return question_cache.QuestionRecord(r[0], r[1], r[2], (r[3], r[4], r[5], r[6]), r[7], r[8], r[9], r[10])
+
+def load_questions(subject_id):
+    """Question records for one subject"""
+    rows = question_rows().filter(Question.subject_id == subject_id).order_by(Question.id).all()
+    return [to_record(r) for r in rows]
+
+def load_question_ids(subject_id):
+    """(id, difficulty) pairs for one subject, read from the index alone"""
+    return db.session.query(Question.id, Question.difficulty).filter_by(subject_id=subject_id).all()
+
+questions_cache = question_cache.QuestionCache(bank_version, load_questions)
+question_index = question_cache.QuestionIndex(bank_version, load_question_ids)
+
+def fetch_questions(subject_id, ids):
+    """Records for the given ids in the given order, from the cache if warm"""
+    cached = questions_cache.peek(subject_id)
+    if cached is not None:
+        return [cached.by_id[i] for i in ids]
+    by_id = {r[0]: to_record(r) for r in question_rows().filter(Question.id.in_(ids))}
+    return [by_id[i] for i in ids if i in by_id]
+
+def find_question(question_id, subject_id=None):
+    """The cached record for one question, or None"""
+    if subject_id is None:
+        subject_id = db.session.query(Question.subject_id).filter_by(id=question_id).scalar()
+        if subject_id is None:
+            return None
+    return questions_cache.get(subject_id).by_id.get(question_id)
+
+def warm_question_cache():
+    """Preload the subject list and every subject's questions"""
+    with app.app_context():
+        bank_version.poll(read_bank_state, app.config['BANK_VERSION_POLL'])
+        subjects_cache.get()
+        subject_ids = [row[0] for row in db.session.query(Subject.id)]
+        return questions_cache.warm(subject_ids)
+
+# ==================== LEADERBOARDS ====================
+
+def load_leaderboard_entries():
+    """(scope, RankedAttempt) pairs from the backing table"""
+    return [(e.scope, leaderboard.RankedAttempt(
+        e.attempt_id, e.user_id, e.username, e.subject_id, e.subject,
+        e.score, e.total_questions, e.completed_at
+    )) for e in LeaderboardEntry.query.all()]
+
+leaderboards = leaderboard.Leaderboards(load_leaderboard_entries, size=app.config['LEADERBOARD_SIZE'])
+
+def rebuild_leaderboards():
+    """Recompute every board from all attempts (backfill or repair)"""
+    db.session.execute(db.delete(LeaderboardEntry))
+    db.session.execute(db.text('''
+        INSERT INTO leaderboard_entry (scope, attempt_id, user_id, username, subject_id,
+                                       subject, score, total_questions, completed_at)
+        WITH ranked AS (
+            SELECT a.id, a.user_id, u.username, a.subject_id, s.name AS subject,
+                   a.score, a.total_questions, a.completed_at,
+                   ROW_NUMBER() OVER (PARTITION BY a.subject_id
+                                      ORDER BY a.score DESC, a.completed_at, a.id) AS subject_rank,
+                   ROW_NUMBER() OVER (ORDER BY a.score DESC, a.completed_at, a.id) AS global_rank
+            FROM quiz_attempt a
+            JOIN user u ON u.id = a.user_id
+            JOIN subject s ON s.id = a.subject_id
+        )
+        SELECT subject_id, id, user_id, username, subject_id, subject, score, total_questions, completed_at
+        FROM ranked WHERE subject_rank <= :size
+        UNION ALL
+        SELECT 0, id, user_id, username, subject_id, subject, score, total_questions, completed_at
+        FROM ranked WHERE global_rank <= :size
+    '''), {'size': app.config['LEADERBOARD_SIZE']})
+    db.session.commit()
+    leaderboards.reload()
+
+@app.cli.command('rebuild-leaderboards')
+def rebuild_leaderboards_command():
+    """Recompute the materialized leaderboards from quiz attempts"""
+    with app.app_context():
+        db.create_all()
+        rebuild_leaderboards()
+        print('Rebuilt %d leaderboard rows.' % LeaderboardEntry.query.count())
+
+# ==================== USER STATS ====================
+
+def record_user_stats(user_id, subject_id, score):
+    """Add one attempt to the user's rollup row (caller commits)"""
+    db.session.execute(db.text('''
+        INSERT INTO user_subject_stats (user_id, subject_id, attempts, total_score, best_score)
+        VALUES (:user_id, :subject_id, 1, :score, :score)
+        ON CONFLICT (user_id, subject_id) DO UPDATE SET
+            attempts = attempts + 1,
+            total_score = total_score + excluded.total_score,
+            best_score = MAX(best_score, excluded.best_score)
+    '''), {'user_id': user_id, 'subject_id': subject_id, 'score': score})
+
+def rebuild_user_stats():
+    """Recompute every rollup row from quiz attempts"""
+    db.session.execute(db.delete(UserSubjectStats))
+    db.session.execute(db.text('''
+        INSERT INTO user_subject_stats (user_id, subject_id, attempts, total_score, best_score)
+        SELECT user_id, subject_id, COUNT(*), SUM(score), MAX(score)
+        FROM quiz_attempt
+        GROUP BY user_id, subject_id
+    '''))
+    db.session.commit()
+
+def user_subject_totals(user_id):
+    """(subject, icon, attempts, total, best) per subject the user attempted"""
+    if app.config['USER_STATS_ROLLUP']:
+        query = db.session.query(
+            Subject.name,
+            Subject.icon,
+            UserSubjectStats.attempts,
+            UserSubjectStats.total_score,
+            UserSubjectStats.best_score
+        ).join(Subject, Subject.id == UserSubjectStats.subject_id).filter(
+            UserSubjectStats.user_id == user_id
+        ).order_by(Subject.id)
+    else:
+        query = db.session.query(
+            Subject.name,
+            Subject.icon,
+            db.func.count(QuizAttempt.id),
+            db.func.sum(QuizAttempt.score),
+            db.func.max(QuizAttempt.score)
+        ).join(Subject, Subject.id == QuizAttempt.subject_id).filter(
+            QuizAttempt.user_id == user_id
+        ).group_by(QuizAttempt.subject_id).order_by(Subject.id)
+    return query.all()
+
+@app.cli.command('rebuild-user-stats')
+def rebuild_user_stats_command():
+    """Recompute the per-user/per-subject rollups from quiz attempts"""
+    with app.app_context():
+        db.create_all()
+        rebuild_user_stats()
+        print('Rebuilt %d user stats rows.' % UserSubjectStats.query.count())
+
+# ==================== ANSWER ANALYTICS ====================
+
+def write_answer_events(rows):
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(AnswerEvent.__table__.insert(), rows)
+
+answer_events = answer_log.AnswerLog(write_answer_events, batch_size=app.config['ANSWER_LOG_BATCH_SIZE'])
+
+def run_item_analysis():
+    """Recompute question_stats from the answer log, returning (events, questions)"""
+    with db.engine.connect() as conn:
+        events = item_analysis.load_events(conn)
+    rows = []
+    if len(events):
+        result = item_analysis.analyze(events, min_answers=app.config['ANALYTICS_MIN_ANSWERS'])
+        rows = item_analysis.to_rows(result, datetime.utcnow())
+    db.session.execute(db.delete(QuestionStats))
+    if rows:
+        db.session.execute(QuestionStats.__table__.insert(), rows)
+    db.session.commit()
+    # Calibrations are part of the cached question records
+    publish_bank_change()
+    return len(events), len(rows)
+
+@app.cli.command('analyze-answers')
+def analyze_answers_command():
+    """Compute per-question correctness, discrimination and answer times"""
+    if item_analysis.np is None:
+        raise click.ClickException('NumPy is required for answer analytics (pip install numpy)')
+    with app.app_context():
+        db.create_all()
+        events, questions = run_item_analysis()
+        calibrated = QuestionStats.query.filter(QuestionStats.calibrated_difficulty.isnot(None)).count()
+    click.echo('Analyzed %d answers to %d questions (%d calibrated).' % (events, questions, calibrated))
+
+# ==================== AUTHENTICATION ====================
+
+def to_user_record(user):
+    return user_cache.UserRecord(user.id, user.username, user.email)
+
+def load_user(user_id):
+    row = db.session.query(User.id, User.username, User.email).filter_by(id=user_id).first()
+    return user_cache.UserRecord(*row) if row else None
+
+users = user_cache.UserCache(
+    load_user, size=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL']
+).watch(db.session, User)
+
+def current_user():
+    """The signed-in user's UserRecord, looked up at most once per request"""
+    if 'current_user' not in g:
+        user_id = session.get('user_id')
+        g.current_user = users.get(user_id) if user_id is not None else None
+    return g.current_user
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_user() is None:
+            return jsonify({'error': 'Please login first'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def sign_in(user):
+    session['user_id'] = user.id
+    session['username'] = user.username
+    users.put(to_user_record(user))
+
+# ==================== QUIZ SESSIONS ====================
+
+POINTS_PER_ANSWER = 10
+
+quiz_store = quiz_sessions.QuizSessionStore(
+    ttl=app.config['QUIZ_SESSION_TTL'],
+    max_sessions=app.config['QUIZ_SESSION_MAX'],
+    per_user=app.config['QUIZ_SESSION_PER_USER'],
+)
+
+def quiz_records(quiz):
+    """The cached record for each question of a quiz, None if since deleted"""
+    by_id = questions_cache.get(quiz.subject_id).by_id
+    return [by_id.get(question_id) for question_id in quiz.question_ids]
+
+def answer_key(records):
+    """(packed correct options, known-question bitmap) for a quiz's records"""
+    key = quiz_sessions.pack(r.correct if r is not None else 0 for r in records)
+    known = quiz_sessions.pack(1 if r is not None else 0 for r in records)
+    return key, known
+
+def quiz_review(quiz, records):
+    """Per-question results, revealed only once the quiz is graded"""
+    review = []
+    for position, record in enumerate(records):
+        if record is None:
+            continue
+        selected = quiz.choice(position)
+        review.append({
+            'question_id': record.id,
+            'question': record.text,
+            'selected': selected,
+            'correct': selected == record.correct,
+            'correct_index': record.correct,
+            'correct_answer': record.options[record.correct],
+            'explanation': record.explanation
+        })
+    return review
+
+def parse_answer(record, answer):
+    """Option index from an index or the option's text, None if invalid"""
+    if isinstance(answer, int) and not isinstance(answer, bool):
+        return answer if 0 <= answer < len(record.options) else None
+    if isinstance(answer, str) and answer.strip() in record.options:
+        return record.options.index(answer.strip())
+    return None
 
 # ==================== INITIALIZE DATABASE ====================
 
@@ -57,6 +484,25 @@ def init_db():
     """Initialize database with sample data"""
     with app.app_context():
         db.create_all()
+        # create_all() doesn't add indexes to tables that already exist
+        db.session.execute(db.text(
+            'CREATE INDEX IF NOT EXISTS ix_question_subject_difficulty ON question (subject_id, difficulty)'
+        ))
+        db.session.execute(db.text('DROP INDEX IF EXISTS ix_question_subject_id'))
+        db.session.execute(db.text(
+            'CREATE INDEX IF NOT EXISTS ix_quiz_attempt_subject_score ON quiz_attempt (subject_id, score)'
+        ))
+        db.session.execute(db.text(
+            'CREATE INDEX IF NOT EXISTS ix_quiz_attempt_user_subject ON quiz_attempt (user_id, subject_id, score)'
+        ))
+        db.session.commit()
+        
+        # Backfill the leaderboards and rollups of a database that predates them
+        if QuizAttempt.query.first():
+            if not LeaderboardEntry.query.first():
+                rebuild_leaderboards()
+            if not UserSubjectStats.query.first():
+                rebuild_user_stats()
         
         # Check if data already exists
         if Subject.query.first():
@@ -144,16 +590,46 @@ def init_db():
             'MongoDB':[{'question_text':'MongoDB is...?','option_a':'NoSQL DB','option_b':'SQL DB','option_c':'OS','option_d':'Library','correct_answer':0,'difficulty':'Easy','explanation':'MongoDB is NoSQL'}]*10
         }
         
-        for subject_name, questions in sample_questions.items():
-            subj = Subject.query.filter_by(name=subject_name).first()
-            for q in questions:
-                question = Question(subject_id=subj.id, **q)
-                db.session.add(question)
-        
+        subject_ids = dict(db.session.query(Subject.name, Subject.id))
+        importer.insert_questions(db.session.connection(), Question.__table__, [
+            dict(q, subject_id=subject_ids[subject_name])
+            for subject_name, questions in sample_questions.items()
+            for q in questions
+        ])
         db.session.commit()
+        publish_bank_change()
         print("Database initialized with sample subjects and questions.")
 
 
+@app.cli.command('import-questions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(importer.FORMATS), help='Default: from the file extension')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per transaction')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint of an earlier run of this file')
+def import_questions(path, fmt, batch_size, restart):
+    """Bulk-import questions from a JSON, NDJSON or CSV file"""
+    def progress(result):
+        click.echo('  %d records read, %d imported, %d invalid (%.0f rows/s)' % (
+            result.records, result.imported, result.invalid, result.rate))
+    
+    with app.app_context():
+        db.create_all()
+        try:
+            result = importer.import_file(db.engine, Question.__table__, path, fmt=fmt,
+                                          batch_size=batch_size, resume=not restart, progress=progress)
+        except importer.InvalidRow as e:
+            raise click.ClickException(str(e))
+        finally:
+            # Batches committed before a failure are live too
+            publish_bank_change()
+    
+    if result.skipped_resume:
+        click.echo('Resumed after record %d.' % result.skipped_resume)
+    for error in result.errors:
+        click.echo('  skipped %s' % error, err=True)
+    click.echo('Imported %d questions (%d new subjects, %d invalid records) in %.1fs.' % (
+        result.imported, result.subjects_created, result.invalid, result.seconds))
+
 # ==================== ROUTES ====================
 
 @app.route('/')
@@ -163,32 +639,85 @@ def index():
 @app.route('/api/subjects', methods=['GET'])
 def get_subjects():
     """Get all subjects with question count"""
-    subjects = Subject.query.all()
-    return jsonify([{
-        'id': s.id,
-        'name': s.name,
-        'icon': s.icon,
-        'description': s.description,
-        'question_count': len(s.questions)
-    } for s in subjects])
+    return subjects_cache.response()
 
 @app.route('/api/questions/<int:subject_id>', methods=['GET'])
+@login_required
 def get_questions(subject_id):
-    """Get all questions for a subject"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Please login first'}), 401
+    """Start a quiz over a subject's questions, or a random sample of them
+
+    ``count`` limits the quiz to that many questions, ``difficulty`` keeps
+    one difficulty level and ``seed`` makes the sample reproducible.  The
+    quiz session token comes back in the ``X-Quiz-Session`` header.
+    """
+    count = request.args.get('count', type=int)
+    difficulty = request.args.get('difficulty', '').strip()
+    seed = request.args.get('seed', type=int)
+    if count is None and not difficulty:
+        ids = [r.id for r in questions_cache.get(subject_id).records]
+        response = questions_cache.response(subject_id)
+    else:
+        count = max(1, min(count or app.config['QUIZ_MAX_QUESTIONS'], app.config['QUIZ_MAX_QUESTIONS']))
+        if seed is None:
+            seed = random.getrandbits(32)
+        ids = question_index.sample(subject_id, count, difficulty, random.Random(seed))
+        records = fetch_questions(subject_id, ids)
+        ids = [r.id for r in records]
+        response = jsonify([r.as_dict() for r in records])
+        response.headers['X-Quiz-Seed'] = str(seed)
+    if ids:
+        quiz = quiz_store.create(current_user().id, subject_id, ids)
+        response.headers['X-Quiz-Session'] = quiz.token
+    return response
+
+@app.route('/api/submit-answer', methods=['POST'])
+@login_required
+@limiter.limit(120, burst=30, per='minute')
+def submit_answer():
+    """Lock in one answer of a quiz session and add it to the answer log
+
+    Whether it was right is only revealed by /api/submit-quiz, after the
+    whole quiz is graded.
+    """
+    data = request.json or {}
+    question_id = data.get('question_id')
+    if not isinstance(question_id, int):
+        return jsonify({'error': 'question_id is required'}), 400
+    quiz = quiz_store.get(data.get('quiz_id'), current_user().id)
+    if quiz is None:
+        return jsonify({'error': 'Quiz session expired, please start the quiz again'}), 404
+    position = quiz.position(question_id)
+    if position is None:
+        return jsonify({'error': 'Question is not part of this quiz'}), 400
+    record = find_question(question_id, quiz.subject_id)
+    if record is None:
+        return jsonify({'error': 'Unknown question'}), 404
+    selected = parse_answer(record, data.get('answer'))
+    if selected is None:
+        return jsonify({'error': 'Invalid answer'}), 400
+    if not quiz_store.answer(quiz, position, selected):
+        return jsonify({'error': 'Question already answered'}), 409
+    time_ms = data.get('time_ms')
+    if not isinstance(time_ms, int) or not 0 <= time_ms <= 3600000:
+        time_ms = None
     
-    questions = Question.query.filter_by(subject_id=subject_id).all()
-    return jsonify([{
-        'id': q.id,
-        'question': q.question_text,
-        'options': [q.option_a, q.option_b, q.option_c, q.option_d],
-        'correct': q.correct_answer,
-        'difficulty': q.difficulty,
-        'explanation': q.explanation
-    } for q in questions])
+    answer_events.append({
+        'user_id': current_user().id,
+        'subject_id': record.subject_id,
+        'question_id': record.id,
+        'selected': selected,
+        'correct': selected == record.correct,
+        'time_ms': time_ms,
+        'answered_at': datetime.utcnow()
+    })
+    return jsonify({
+        'recorded': True,
+        'answered': quiz.answered_count(),
+        'total_questions': len(quiz.question_ids)
+    })
 
 @app.route('/api/register', methods=['POST'])
+@limiter.limit(5, burst=3, per='minute')
 def register():
     """Register a new user"""
     data = request.json
@@ -199,7 +728,7 @@ def register():
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'error': 'Email already exists'}), 400
     
-    hashed_password = generate_password_hash(data['password'])
+    hashed_password = hasher.hash(data['password'])
     user = User(
         username=data['username'],
         email=data['email'],
@@ -209,8 +738,7 @@ def register():
     db.session.add(user)
     db.session.commit()
     
-    session['user_id'] = user.id
-    session['username'] = user.username
+    sign_in(user)
     
     return jsonify({
         'message': 'Registration successful',
@@ -218,14 +746,23 @@ def register():
     })
 
 @app.route('/api/login', methods=['POST'])
+@limiter.limit(10, burst=5, per='minute')
 def login():
     """Login user"""
     data = request.json
     user = User.query.filter_by(username=data['username']).first()
     
-    if user and check_password_hash(user.password, data['password']):
-        session['user_id'] = user.id
-        session['username'] = user.username
+    matches, outdated = hasher.verify(user.password, data['password']) if user else (False, False)
+    if matches:
+        if outdated:
+            # Upgrade a hash made with older parameters while we have the password
+            try:
+                user.password = hasher.hash(data['password'])
+                db.session.commit()
+                hasher.note_rehash()
+            except password_hashing.HasherBusy:
+                pass
+        sign_in(user)
         return jsonify({
             'message': 'Login successful',
             'user': {'id': user.id, 'username': user.username, 'email': user.email}
@@ -242,64 +779,98 @@ def logout():
 @app.route('/api/check-auth', methods=['GET'])
 def check_auth():
     """Check if user is authenticated"""
-    if 'user_id' in session:
-        user = User.query.get(session['user_id'])
-        return jsonify({
-            'authenticated': True,
-            'user': {'id': user.id, 'username': user.username, 'email': user.email}
-        })
+    user = current_user()
+    if user is not None:
+        return jsonify({'authenticated': True, 'user': user.as_dict()})
     return jsonify({'authenticated': False})
 
 @app.route('/api/submit-quiz', methods=['POST'])
+@login_required
 def submit_quiz():
-    """Submit quiz attempt and save score"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Please login first'}), 401
+    """Finish a quiz session: grade its answers and save the score"""
+    user = current_user()
+    data = request.json or {}
+    quiz = quiz_store.claim(data.get('quiz_id'), user.id)
+    if quiz is None:
+        return jsonify({'error': 'Quiz session expired or already submitted'}), 400
+    try:
+        response = grade_quiz(user, quiz)
+    except Exception:
+        # Nothing was saved; the player can submit again
+        quiz_store.release(quiz)
+        raise
+    quiz_store.finish(quiz)
+    return response
+
+def grade_quiz(user, quiz):
+    """Score a claimed quiz and commit the attempt and leaderboard entries"""
+    subject = db.session.get(Subject, quiz.subject_id)
+    if subject is None:
+        return jsonify({'error': 'Unknown subject'}), 400
     
-    data = request.json
+    # Grade every answer at once against the cached answer key
+    records = quiz_records(quiz)
+    key, known = answer_key(records)
+    correct = quiz.grade(key, known)
     attempt = QuizAttempt(
-        user_id=session['user_id'],
-        subject_id=data['subject_id'],
-        score=data['score'],
-        total_questions=data['total_questions']
+        user_id=user.id,
+        subject_id=subject.id,
+        score=correct * POINTS_PER_ANSWER,
+        total_questions=len(quiz.question_ids)
     )
     
     db.session.add(attempt)
-    db.session.commit()
+    db.session.flush()
+    if app.config['USER_STATS_ROLLUP']:
+        record_user_stats(attempt.user_id, subject.id, attempt.score)
+    
+    # Update the materialized leaderboards in the same transaction
+    added, removed = leaderboards.offer(leaderboard.RankedAttempt(
+        attempt.id, user.id, user.username,
+        subject.id, subject.name, attempt.score, attempt.total_questions, attempt.completed_at
+    ))
+    try:
+        for scope, evicted in removed:
+            db.session.execute(db.delete(LeaderboardEntry).filter_by(scope=scope, attempt_id=evicted.attempt_id))
+        for scope, ranked in added:
+            db.session.add(LeaderboardEntry(
+                scope=scope, attempt_id=ranked.attempt_id, user_id=ranked.user_id,
+                username=ranked.username, subject_id=ranked.subject_id, subject=ranked.subject,
+                score=ranked.score, total_questions=ranked.total,
+                completed_at=ranked.completed_at
+            ))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        leaderboards.reload()
+        raise
     
-    return jsonify({'message': 'Quiz submitted successfully'})
+    return jsonify({
+        'message': 'Quiz submitted successfully',
+        'score': attempt.score,
+        'total_questions': attempt.total_questions,
+        'correct_answers': correct,
+        'percentage': round(correct / attempt.total_questions * 100),
+        'review': quiz_review(quiz, records)
+    })
 
 @app.route('/api/leaderboard', methods=['GET'])
 def get_leaderboard():
     """Get top scores across all users"""
-    results = db.session.query(
-        User.username,
-        Subject.name.label('subject'),
-        QuizAttempt.score,
-        QuizAttempt.total_questions,
-        QuizAttempt.completed_at
-    ).join(QuizAttempt).join(Subject).order_by(
-        QuizAttempt.score.desc()
-    ).limit(10).all()
-    
-    return jsonify([{
-        'username': r.username,
-        'subject': r.subject,
-        'score': r.score,
-        'total': r.total_questions,
-        'percentage': round((r.score / (r.total_questions * 10)) * 100),
-        'date': r.completed_at.strftime('%Y-%m-%d')
-    } for r in results])
+    return jsonify(leaderboards.top(leaderboard.GLOBAL))
+
+@app.route('/api/leaderboard/<int:subject_id>', methods=['GET'])
+def get_subject_leaderboard(subject_id):
+    """Get top scores for one subject"""
+    return jsonify(leaderboards.top(subject_id))
 
 @app.route('/api/user-stats', methods=['GET'])
+@login_required
 def get_user_stats():
     """Get user statistics"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Please login first'}), 401
+    rows = user_subject_totals(current_user().id)
     
-    attempts = QuizAttempt.query.filter_by(user_id=session['user_id']).all()
-    
-    if not attempts:
+    if not rows:
         return jsonify({
             'total_quizzes': 0,
             'average_score': 0,
@@ -307,30 +878,64 @@ def get_user_stats():
             'subjects_attempted': []
         })
     
-    total_score = sum(a.score for a in attempts)
-    avg_score = total_score / len(attempts)
-    
-    subject_stats = {}
-    for attempt in attempts:
-        subj_name = attempt.subject.name
-        if subj_name not in subject_stats:
-            subject_stats[subj_name] = {'count': 0, 'total': 0}
-        subject_stats[subj_name]['count'] += 1
-        subject_stats[subj_name]['total'] += attempt.score
+    total_quizzes = sum(r[2] for r in rows)
+    total_score = sum(r[3] for r in rows)
     
     return jsonify({
-        'total_quizzes': len(attempts),
-        'average_score': round(avg_score, 2),
+        'total_quizzes': total_quizzes,
+        'average_score': round(total_score / total_quizzes, 2),
         'total_score': total_score,
         'subjects_attempted': [{
-            'subject': k,
-            'attempts': v['count'],
-            'average': round(v['total'] / v['count'], 2)
-        } for k, v in subject_stats.items()]
+            'subject': name,
+            'icon': icon,
+            'attempts': attempts,
+            'average': round(total / attempts, 2),
+            'best': best
+        } for name, icon, attempts, total, best in rows]
+    })
+
+@app.route('/api/rate-limits', methods=['GET'])
+def rate_limits():
+    """Admission-control counters per route"""
+    return jsonify(limiter.get_stats())
+
+@app.route('/api/hash-stats', methods=['GET'])
+def hash_stats():
+    """Password hashing pool timings and rejections"""
+    return jsonify(hasher.get_stats())
+
+@app.errorhandler(password_hashing.HasherBusy)
+def hasher_busy(e):
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@app.route('/api/db-stats', methods=['GET'])
+def db_stats():
+    """Connection pool statistics"""
+    stats = pool_stats.as_dict()
+    stats['pool'] = db.engine.pool.status()
+    stats['answer_log'] = answer_events.get_stats()
+    return jsonify(stats)
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    """Question bank cache statistics"""
+    return jsonify({
+        'bank_version': bank_version.value,
+        'subjects': subjects_cache.get_stats(),
+        'questions': questions_cache.get_stats(),
+        'question_index': question_index.get_stats(),
+        'leaderboards': leaderboards.get_stats(),
+        'users': users.get_stats(),
+        'quiz_sessions': quiz_store.get_stats()
     })
 
 # ==================== RUN APP ====================
 
 if __name__ == '__main__':
+    hasher.start()
     init_db()
+    if app.config['QUESTION_CACHE_WARMUP']:
+        warm_question_cache()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
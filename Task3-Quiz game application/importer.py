@@ -0,0 +1,294 @@
+"""Streaming bulk import of question banks
+
+Reads questions from JSON (an array of objects), NDJSON (one object per
+line) or CSV without loading the file into memory, validates each row,
+creates missing subjects, and inserts questions through Core
+``executemany`` in batches of ``batch_size`` rows, one transaction per
+batch.
+
+Each batch commits together with a checkpoint row in ``import_progress``
+(file path, size/mtime fingerprint, records consumed), so an interrupted
+import resumes after the last committed batch instead of starting over
+or inserting duplicates.
+
+Row fields: ``subject``, ``question_text`` (or ``question``), ``option_a``
+.. ``option_d`` (or an ``options`` list of four), ``correct_answer`` (0-3
+or A-D), ``difficulty`` (Easy/Medium/Hard), and optional ``explanation``,
+``subject_icon`` and ``subject_description``.
+"""
+import csv
+import json
+import os
+import time
+
+from sqlalchemy import text  # pyright: ignore[reportMissingImports]
+
+FORMATS = ('json', 'ndjson', 'csv')
+DIFFICULTIES = {'easy': 'Easy', 'medium': 'Medium', 'hard': 'Hard'}
+OPTION_FIELDS = ('option_a', 'option_b', 'option_c', 'option_d')
+MAX_OPTION_LENGTH = 200
+DEFAULT_ICON = '📚'
+
+PROGRESS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS import_progress (
+        source TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        records_done INTEGER NOT NULL,
+        rows_imported INTEGER NOT NULL,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+class InvalidRow(ValueError):
+    """A record that can't be imported; the message says why"""
+
+
+# ==================== READERS ====================
+
+def read_ndjson(f):
+    """Yield the non-blank lines; each is parsed as its own record"""
+    for line in f:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def parse_json_line(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise InvalidRow('invalid JSON (%s)' % e.msg)
+
+
+def read_json(f, chunk_size=1 << 16):
+    """Yield the objects of a top-level JSON array, one at a time
+
+    Malformed JSON raises ``InvalidRow``: past a syntax error the array
+    can't be resynchronized, so it ends the import.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    count = 0
+    started = False
+    eof = False
+    while True:
+        # Skip whitespace, the opening bracket and separators
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ',' or
+                                     (not started and buffer[pos] == '[')):
+            started = started or buffer[pos] == '['
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        if pos < len(buffer):
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except ValueError as e:
+                if eof:
+                    raise InvalidRow('Invalid JSON after record %d: %s' % (count, e.msg))
+            else:
+                count += 1
+                yield obj
+                pos = end
+                continue
+        elif eof:
+            return
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def read_csv(f):
+    return csv.DictReader(f)
+
+
+READERS = {'json': read_json, 'ndjson': read_ndjson, 'csv': read_csv}
+# Per-record parsing done inside the import loop, so a bad record is skipped
+PARSERS = {'ndjson': parse_json_line}
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext == 'jsonl':
+        return 'ndjson'
+    if ext in FORMATS:
+        return ext
+    raise InvalidRow('Cannot tell the format of %s, pass --format' % path)
+
+
+# ==================== VALIDATION ====================
+
+def _text(raw, name, required=True):
+    value = raw.get(name)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise InvalidRow('missing %s' % name)
+    return value
+
+
+def normalize(raw):
+    """Validate one record, returning (subject fields, question row)"""
+    if not isinstance(raw, dict):
+        raise InvalidRow('not an object')
+    subject = _text(raw, 'subject')
+    question_text = _text(raw, 'question_text', required=False) or _text(raw, 'question')
+
+    options = raw.get('options')
+    if options is not None:
+        if not isinstance(options, list) or len(options) != 4:
+            raise InvalidRow('options must be a list of four')
+        raw = dict(raw, **dict(zip(OPTION_FIELDS, options)))
+    row = {'question_text': question_text}
+    for field in OPTION_FIELDS:
+        value = _text(raw, field)
+        if len(value) > MAX_OPTION_LENGTH:
+            raise InvalidRow('%s longer than %d characters' % (field, MAX_OPTION_LENGTH))
+        row[field] = value
+
+    answer = _text(raw, 'correct_answer').upper()
+    if answer in ('A', 'B', 'C', 'D'):
+        row['correct_answer'] = 'ABCD'.index(answer)
+    elif answer in ('0', '1', '2', '3'):
+        row['correct_answer'] = int(answer)
+    else:
+        raise InvalidRow('correct_answer must be 0-3 or A-D')
+
+    difficulty = DIFFICULTIES.get(_text(raw, 'difficulty').lower())
+    if difficulty is None:
+        raise InvalidRow('difficulty must be Easy, Medium or Hard')
+    row['difficulty'] = difficulty
+    row['explanation'] = _text(raw, 'explanation', required=False) or None
+
+    subject_fields = (
+        subject,
+        _text(raw, 'subject_icon', required=False) or None,
+        _text(raw, 'subject_description', required=False) or None,
+    )
+    return subject_fields, row
+
+
+# ==================== WRITING ====================
+
+class SubjectIds:
+    """Subject name -> id, creating subjects the first time they're seen"""
+
+    def __init__(self):
+        self._ids = {}
+        self.created = 0
+
+    def get(self, conn, name, icon=None, description=None):
+        subject_id = self._ids.get(name)
+        if subject_id is not None:
+            return subject_id
+        result = conn.execute(
+            text('INSERT INTO subject (name, icon, description) VALUES (:name, :icon, :description) '
+                 'ON CONFLICT (name) DO NOTHING'),
+            {'name': name, 'icon': icon or DEFAULT_ICON, 'description': description or name}
+        )
+        self.created += result.rowcount
+        subject_id = conn.execute(
+            text('SELECT id FROM subject WHERE name = :name'), {'name': name}
+        ).scalar()
+        self._ids[name] = subject_id
+        return subject_id
+
+
+def insert_questions(conn, question_table, rows):
+    """Insert question rows (dicts) with one executemany"""
+    if rows:
+        conn.execute(question_table.insert(), rows)
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return '%d:%d' % (st.st_size, int(st.st_mtime))
+
+
+class ImportResult:
+    __slots__ = ('records', 'imported', 'skipped_resume', 'invalid', 'errors',
+                 'subjects_created', 'seconds')
+
+    def __init__(self):
+        self.records = 0
+        self.imported = 0
+        self.skipped_resume = 0
+        self.invalid = 0
+        self.errors = []
+        self.subjects_created = 0
+        self.seconds = 0.0
+
+    @property
+    def rate(self):
+        return self.imported / self.seconds if self.seconds else 0.0
+
+
+def import_file(engine, question_table, path, fmt=None, batch_size=5000, resume=True,
+                max_errors=20, progress=None):
+    """Stream ``path`` into the question table, returning an ImportResult
+
+    ``progress(result)`` is called after every committed batch.
+    """
+    fmt = fmt or detect_format(path)
+    source = os.path.abspath(path)
+    fingerprint = _fingerprint(path)
+    result = ImportResult()
+    subjects = SubjectIds()
+    started = time.monotonic()
+
+    with engine.begin() as conn:
+        conn.execute(text(PROGRESS_SCHEMA))
+        checkpoint = conn.execute(
+            text('SELECT fingerprint, records_done, rows_imported FROM import_progress WHERE source = :source'),
+            {'source': source}
+        ).first()
+    resume_after = imported_before = 0
+    if resume and checkpoint is not None and checkpoint[0] == fingerprint:
+        resume_after, imported_before = checkpoint[1], checkpoint[2]
+
+    def commit(batch):
+        with engine.begin() as conn:
+            rows = []
+            for subject_fields, row in batch:
+                rows.append(dict(row, subject_id=subjects.get(conn, *subject_fields)))
+            insert_questions(conn, question_table, rows)
+            conn.execute(
+                text('INSERT INTO import_progress (source, fingerprint, records_done, rows_imported) '
+                     'VALUES (:source, :fingerprint, :done, :imported) '
+                     'ON CONFLICT (source) DO UPDATE SET fingerprint = excluded.fingerprint, '
+                     'records_done = excluded.records_done, rows_imported = excluded.rows_imported, '
+                     'updated_at = CURRENT_TIMESTAMP'),
+                {'source': source, 'fingerprint': fingerprint, 'done': result.records,
+                 'imported': imported_before + result.imported + len(rows)}
+            )
+        result.imported += len(rows)
+        result.subjects_created = subjects.created
+        result.seconds = time.monotonic() - started
+        if progress is not None:
+            progress(result)
+
+    batch = []
+    parse = PARSERS.get(fmt)
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for raw in READERS[fmt](f):
+            result.records += 1
+            if result.records <= resume_after:
+                result.skipped_resume += 1
+                continue
+            try:
+                if parse is not None:
+                    raw = parse(raw)
+                batch.append(normalize(raw))
+            except InvalidRow as e:
+                result.invalid += 1
+                if len(result.errors) < max_errors:
+                    result.errors.append('record %d: %s' % (result.records, e))
+            if len(batch) >= batch_size:
+                commit(batch)
+                batch = []
+    # The last commit also records the final position, even if it was
+    # made up of invalid records only
+    commit(batch)
+    result.seconds = time.monotonic() - started
+    return result
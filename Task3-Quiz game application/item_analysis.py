@@ -0,0 +1,141 @@
+"""Item analysis over the answer event log
+
+Loads ``answer_event`` into flat NumPy columns and computes, per question,
+in a handful of vectorized passes (no Python loop over events or
+questions):
+
+* correctness rate: share of answers that were right;
+* discrimination index: correctness among the strongest ``GROUP_FRACTION``
+  of respondents minus correctness among the weakest, where a respondent
+  is one user within one subject, ranked by their share of right answers
+  in that subject (the classic upper/lower 27% index, from -1 to 1);
+* time to answer: 25th, 50th and 90th percentile in milliseconds;
+* calibrated difficulty: Easy/Medium/Hard from the correctness rate, once
+  a question has ``min_answers`` answers.
+"""
+from array import array
+
+try:
+    import numpy as np  # pyright: ignore[reportMissingImports]
+except ImportError:
+    np = None
+
+GROUP_FRACTION = 0.27
+TIME_QUANTILES = (0.25, 0.5, 0.9)
+# Correctness rate at or above which a question counts as Easy / Medium
+EASY_RATE = 0.8
+MEDIUM_RATE = 0.5
+
+EVENTS_SQL = 'SELECT question_id, user_id, subject_id, correct, time_ms FROM answer_event'
+
+
+class EventColumns:
+    __slots__ = ('question_id', 'user_id', 'subject_id', 'correct', 'time_ms')
+
+    def __init__(self, question_id, user_id, subject_id, correct, time_ms):
+        self.question_id = question_id
+        self.user_id = user_id
+        self.subject_id = subject_id
+        self.correct = correct
+        self.time_ms = time_ms
+
+    def __len__(self):
+        return len(self.question_id)
+
+
+def load_events(conn, chunk_size=50000):
+    """Read every event into int64 columns; a missing time is -1"""
+    columns = [array('q') for _ in EventColumns.__slots__]
+    result = conn.exec_driver_sql(EVENTS_SQL)
+    while True:
+        rows = result.fetchmany(chunk_size)
+        if not rows:
+            break
+        for column, values in zip(columns, zip(*rows)):
+            column.extend(-1 if v is None else int(v) for v in values)
+    return EventColumns(*(np.frombuffer(c, dtype=np.int64) if len(c) else np.zeros(0, np.int64)
+                          for c in columns))
+
+
+def _ratio(numerator, denominator):
+    out = np.full(len(denominator), np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def analyze(events, min_answers=20, group_fraction=GROUP_FRACTION):
+    """Per-question statistics as a dict of equal-length arrays"""
+    questions, q = np.unique(events.question_id, return_inverse=True)
+    n_questions = len(questions)
+    correct = (events.correct > 0).astype(np.float64)
+
+    answers = np.bincount(q, minlength=n_questions)
+    correct_rate = _ratio(np.bincount(q, correct, n_questions), answers)
+
+    # Respondents: one per (subject, user), ranked within the subject
+    pairs = np.stack([events.subject_id, events.user_id], axis=1)
+    respondents, r = np.unique(pairs, axis=0, return_inverse=True)
+    r = r.reshape(-1)
+    score = np.bincount(r, correct) / np.bincount(r)
+    subject = respondents[:, 0]
+    order = np.lexsort((score, subject))
+    _, first, size = np.unique(subject[order], return_index=True, return_counts=True)
+    group = np.repeat(np.arange(len(first)), size)
+    percentile = np.empty(len(respondents))
+    percentile[order] = (np.arange(len(order)) - first[group] + 0.5) / size[group]
+    upper = (percentile >= 1 - group_fraction)[r]
+    lower = (percentile < group_fraction)[r]
+    discrimination = (
+        _ratio(np.bincount(q, correct * upper, n_questions), np.bincount(q, upper, n_questions)) -
+        _ratio(np.bincount(q, correct * lower, n_questions), np.bincount(q, lower, n_questions))
+    )
+
+    # Grouped percentiles: sort answer times by (question, time), then
+    # index into each question's run
+    timed = events.time_ms >= 0
+    tq, tt = q[timed], events.time_ms[timed]
+    order = np.lexsort((tt, tq))
+    tt = tt[order]
+    counts = np.bincount(tq, minlength=n_questions)
+    starts = np.cumsum(counts) - counts
+    times = {}
+    for fraction in TIME_QUANTILES:
+        position = starts + np.floor(fraction * np.maximum(counts - 1, 0)).astype(np.int64)
+        values = np.full(n_questions, np.nan)
+        has_times = counts > 0
+        values[has_times] = tt[position[has_times]]
+        times[fraction] = values
+
+    calibrated = np.where(correct_rate >= EASY_RATE, 'Easy',
+                          np.where(correct_rate >= MEDIUM_RATE, 'Medium', 'Hard')).astype(object)
+    calibrated[answers < min_answers] = None
+
+    return {
+        'question_id': questions,
+        'answers': answers,
+        'correct_rate': correct_rate,
+        'discrimination': discrimination,
+        'time_p25_ms': times[0.25],
+        'time_p50_ms': times[0.5],
+        'time_p90_ms': times[0.9],
+        'calibrated_difficulty': calibrated,
+    }
+
+
+def to_rows(result, computed_at):
+    """Rows for the question_stats table; NaN becomes NULL"""
+    def value(column, i, cast):
+        v = result[column][i]
+        return None if v is None or (isinstance(v, float) and np.isnan(v)) else cast(v)
+
+    return [{
+        'question_id': int(result['question_id'][i]),
+        'answers': int(result['answers'][i]),
+        'correct_rate': value('correct_rate', i, lambda v: round(float(v), 4)),
+        'discrimination': value('discrimination', i, lambda v: round(float(v), 4)),
+        'time_p25_ms': value('time_p25_ms', i, int),
+        'time_p50_ms': value('time_p50_ms', i, int),
+        'time_p90_ms': value('time_p90_ms', i, int),
+        'calibrated_difficulty': result['calibrated_difficulty'][i],
+        'computed_at': computed_at,
+    } for i in range(len(result['question_id']))]
@@ -0,0 +1,127 @@
+"""Materialized top-N leaderboards
+
+Instead of sorting every quiz attempt on each leaderboard request, the
+best ``size`` attempts overall and per subject are kept in bounded
+min-heaps in memory, backed by the ``leaderboard_entry`` table so they
+survive restarts.  ``offer`` places a new attempt in O(log size) and
+reports which rows the backing table must gain or lose; a read only
+sorts ``size`` entries, however many attempts have been made.
+"""
+import heapq
+import threading
+
+GLOBAL = 0  # scope of the all-subjects board; subject boards use the subject id
+
+
+class RankedAttempt:
+    __slots__ = ('attempt_id', 'user_id', 'username', 'subject_id', 'subject',
+                 'score', 'total', 'completed_at')
+
+    def __init__(self, attempt_id, user_id, username, subject_id, subject, score, total, completed_at):
+        self.attempt_id = attempt_id
+        self.user_id = user_id
+        self.username = username
+        self.subject_id = subject_id
+        self.subject = subject
+        self.score = score
+        self.total = total
+        self.completed_at = completed_at
+
+    @property
+    def key(self):
+        # Higher score first; on a tie the earlier attempt ranks higher
+        return (self.score, -self.completed_at.timestamp(), -self.attempt_id)
+
+    def as_dict(self):
+        return {
+            'username': self.username,
+            'subject': self.subject,
+            'score': self.score,
+            'total': self.total,
+            'percentage': round((self.score / (self.total * 10)) * 100) if self.total else 0,
+            'date': self.completed_at.strftime('%Y-%m-%d'),
+            'completed_at': self.completed_at.isoformat()
+        }
+
+
+class Leaderboards:
+    """Global and per-subject top-``size`` heaps, loaded lazily by ``loader``
+
+    ``loader()`` returns ``(scope, RankedAttempt)`` pairs from the backing
+    table.
+    """
+
+    def __init__(self, loader, size=10):
+        self.loader = loader
+        self.size = size
+        self._heaps = None
+        self._views = {}
+        self._lock = threading.Lock()
+        self.offers = 0
+        self.placed = 0
+
+    def _ensure_loaded(self):
+        if self._heaps is None:
+            with self._lock:
+                if self._heaps is None:
+                    heaps = {}
+                    for scope, attempt in self.loader():
+                        heap = heaps.setdefault(scope, [])
+                        heapq.heappush(heap, (attempt.key, attempt))
+                        if len(heap) > self.size:
+                            heapq.heappop(heap)
+                    self._heaps = heaps
+                    self._views = {}
+
+    def reload(self):
+        """Drop the in-memory boards; they are re-read on next use"""
+        with self._lock:
+            self._heaps = None
+            self._views = {}
+
+    def offer(self, attempt):
+        """Place a new attempt on its subject board and the global board
+
+        Returns ``(added, removed)`` lists of ``(scope, RankedAttempt)`` for
+        the caller to mirror into the backing table.
+        """
+        self._ensure_loaded()
+        added, removed = [], []
+        with self._lock:
+            self.offers += 1
+            for scope in (GLOBAL, attempt.subject_id):
+                heap = self._heaps.setdefault(scope, [])
+                item = (attempt.key, attempt)
+                if len(heap) < self.size:
+                    heapq.heappush(heap, item)
+                elif item[0] > heap[0][0]:
+                    _, evicted = heapq.heapreplace(heap, item)
+                    removed.append((scope, evicted))
+                else:
+                    continue
+                added.append((scope, attempt))
+                self._views.pop(scope, None)
+            if added:
+                self.placed += 1
+        return added, removed
+
+    def top(self, scope=GLOBAL):
+        """The board as a list of dicts, best first"""
+        self._ensure_loaded()
+        view = self._views.get(scope)
+        if view is None:
+            with self._lock:
+                ranked = sorted(self._heaps.get(scope, ()), key=lambda item: item[0], reverse=True)
+                view = [attempt.as_dict() for _, attempt in ranked]
+                self._views[scope] = view
+        return view
+
+    def get_stats(self):
+        heaps = self._heaps or {}
+        return {
+            'loaded': self._heaps is not None,
+            'boards': len(heaps),
+            'size': self.size,
+            'offers': self.offers,
+            'placed': self.placed,
+        }
@@ -0,0 +1,166 @@
+"""Password hashing off the request threads
+
+scrypt and PBKDF2 are slow on purpose, and while a request thread is busy
+hashing it can't serve quiz traffic.  ``PasswordHasher`` runs the hashing
+on a small process pool.  A burst of logins then uses at most ``workers``
+cores, and the other request threads stay free.  Once ``max_pending``
+hashes are queued or running, further callers get ``HasherBusy`` straight
+away rather than waiting behind the burst.
+
+The algorithm and cost come from a werkzeug method string (``scrypt``,
+``scrypt:65536:8:1``, ``pbkdf2:sha256:600000`` ...).  ``verify`` also
+reports whether a stored hash used other parameters, so the caller can
+rehash the password on a successful login.
+"""
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash  # pyright: ignore[reportMissingImports]
+
+
+class HasherBusy(Exception):
+    """Too many hashes already queued"""
+
+
+def _hash(password, method, salt_length):
+    started = time.perf_counter()
+    return generate_password_hash(password, method, salt_length), time.perf_counter() - started
+
+
+def _check(stored, password):
+    started = time.perf_counter()
+    return check_password_hash(stored, password), time.perf_counter() - started
+
+
+class _Timings:
+    __slots__ = ('count', 'total', 'recent')
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def as_dict(self):
+        recent = sorted(self.recent)
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 2) if self.count else None,
+            'p50_ms': round(recent[len(recent) // 2] * 1000, 2) if recent else None,
+            'p99_ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.99))] * 1000, 2) if recent else None,
+        }
+
+
+class PasswordHasher:
+    """Hash and verify passwords on a bounded process pool
+
+    ``workers=0`` hashes on the calling thread (same API, no pool).
+    """
+
+    def __init__(self, method='scrypt', salt_length=16, workers=2, max_pending=32, timeout=10.0):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        # The parameter prefix werkzeug writes for this method, e.g.
+        # 'scrypt:32768:8:1'; stored hashes with another prefix are outdated
+        self.prefix = generate_password_hash('', method, 1).split('$', 1)[0]
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._timings = {'hash': _Timings(256), 'verify': _Timings(256)}
+        self._stats = {'rejected': 0, 'timeouts': 0, 'rehashed': 0}
+
+    def start(self):
+        """Create the pool and fork its workers now
+
+        Call this before serving (see ``__main__``) so the workers are forked
+        from a single-threaded process rather than from a request thread.
+        A fork-context pool launches every worker on its first submit.
+        """
+        if self.workers:
+            executor = self._get_executor()
+            for future in [executor.submit(int) for _ in range(self.workers)]:
+                future.result()
+        return self
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Forked workers don't re-import the app; spawn where
+                    # fork is unavailable (Windows)
+                    method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+                    self._executor = ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context(method)
+                    )
+        return self._executor
+
+    def _run(self, kind, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HasherBusy('Too many sign-ins in progress, please try again')
+        if not self.workers:
+            try:
+                value, seconds = fn(*args)
+            finally:
+                self._slots.release()
+        else:
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except BaseException:
+                self._slots.release()
+                raise
+            # The slot is held until the hash itself finishes, even if this
+            # caller stops waiting for it, so max_pending bounds pool work
+            future.add_done_callback(lambda f: self._slots.release())
+            try:
+                value, seconds = future.result(self.timeout)
+            except FutureTimeout:
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                raise HasherBusy('Sign-in is taking too long, please try again')
+        with self._lock:
+            self._timings[kind].add(seconds)
+        return value
+
+    def hash(self, password):
+        return self._run('hash', _hash, password, self.method, self.salt_length)
+
+    def needs_rehash(self, stored):
+        return stored.split('$', 1)[0] != self.prefix
+
+    def verify(self, stored, password):
+        """Return (matches, needs_rehash)"""
+        if not self._run('verify', _check, stored, password):
+            return False, False
+        return True, self.needs_rehash(stored)
+
+    def note_rehash(self):
+        with self._lock:
+            self._stats['rehashed'] += 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({kind: t.as_dict() for kind, t in self._timings.items()})
+        stats.update({
+            'method': self.prefix,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+        })
+        return stats
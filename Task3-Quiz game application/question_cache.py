@@ -0,0 +1,308 @@
+"""In-memory caches for the question bank
+
+Subjects and questions change only when the bank is edited or imported,
+but they are read on every landing page and quiz start.  Responses built
+from them are cached as pre-serialized JSON bytes with a strong ETag, and
+each subject's questions are also kept as compact ``QuestionRecord``
+objects for lookups by id.
+
+Invalidation is version based: ``BankVersion`` is bumped after every
+commit that inserted, updated or deleted a watched model (bulk Core writes
+call ``bump()`` themselves), and a cache entry built under an older
+version is rebuilt on its next read.  Changes made by other processes (the
+import and analytics CLI commands) reach a running server through a shared
+counter in the database, which ``poll`` checks at most every few seconds.
+"""
+import hashlib
+import itertools
+import json
+import threading
+import time
+from array import array
+
+from flask import Response, request  # pyright: ignore[reportMissingImports]
+from sqlalchemy import event  # pyright: ignore[reportMissingImports]
+
+_CHANGED_KEY = 'question_bank_changed'
+
+
+class BankVersion:
+    """Counter bumped after each commit that changed the question bank"""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+        self._shared = None  # last value seen from ``read_shared``
+        self._checked = None
+
+    def bump(self):
+        with self._lock:
+            self.value += 1
+            return self.value
+
+    def poll(self, read_shared, interval):
+        """Bump if the shared counter moved, reading it at most every ``interval`` seconds
+
+        ``read_shared()`` returns the counter other processes increment
+        after changing the bank.  The first read only records a baseline.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._checked is not None and now - self._checked < interval:
+                return self.value
+            self._checked = now
+        shared = read_shared()
+        with self._lock:
+            if self._shared is not None and shared != self._shared:
+                self.value += 1
+            self._shared = shared
+            return self.value
+
+    def watch(self, session, models):
+        """Bump after commits that flushed changes to any of ``models``"""
+        models = tuple(models)
+
+        @event.listens_for(session, 'after_flush')
+        def _after_flush(sess, flush_context):
+            if any(isinstance(obj, models) for obj in itertools.chain(sess.new, sess.dirty, sess.deleted)):
+                sess.info[_CHANGED_KEY] = True
+
+        @event.listens_for(session, 'after_commit')
+        def _after_commit(sess):
+            if sess.info.pop(_CHANGED_KEY, False):
+                self.bump()
+
+        @event.listens_for(session, 'after_rollback')
+        def _after_rollback(sess):
+            sess.info.pop(_CHANGED_KEY, None)
+
+        return self
+
+
+class CachedJSON:
+    __slots__ = ('body', 'etag', 'version')
+
+    def __init__(self, payload, version):
+        self.body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()[:20]
+        self.version = version
+
+
+def json_response(entry, cache_control='no-cache'):
+    """200 with the cached body, or a bodiless 304 if the client has it"""
+    headers = {'ETag': '"%s"' % entry.etag, 'Cache-Control': cache_control}
+    if request.if_none_match.contains(entry.etag):
+        return Response(status=304, headers=headers)
+    return Response(entry.body, mimetype='application/json', headers=headers)
+
+
+class SubjectListCache:
+    """The /api/subjects payload, rebuilt once per bank version"""
+
+    def __init__(self, version, loader):
+        self.version = version
+        self.loader = loader
+        self._entry = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self):
+        # Read the version before loading: a bump that lands mid-load leaves
+        # the entry tagged with the older version, so it is rebuilt next time
+        current = self.version.value
+        entry = self._entry
+        if entry is not None and entry.version == current:
+            self.hits += 1
+            return entry
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry.version != current:
+                self.misses += 1
+                entry = CachedJSON(self.loader(), current)
+                self._entry = entry
+        return entry
+
+    def response(self):
+        response = json_response(self.get())
+        if response.status_code == 304:
+            self.not_modified += 1
+        return response
+
+    def get_stats(self):
+        return {
+            'cached': self._entry is not None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+        }
+
+
+class QuestionRecord:
+    __slots__ = ('id', 'subject_id', 'text', 'options', 'correct', 'difficulty', 'explanation', 'calibrated')
+
+    def __init__(self, id, subject_id, text, options, correct, difficulty, explanation, calibrated=None):
+        self.id = id
+        self.subject_id = subject_id
+        self.text = text
+        self.options = options
+        self.correct = correct
+        self.difficulty = difficulty
+        self.explanation = explanation
+        # Difficulty measured from answers by item analysis, if known
+        self.calibrated = calibrated
+
+    def as_dict(self):
+        # What players see; the answer and explanation stay on the server
+        return {
+            'id': self.id,
+            'question': self.text,
+            'options': list(self.options),
+            'difficulty': self.difficulty,
+            'calibrated_difficulty': self.calibrated
+        }
+
+
+class SubjectQuestions:
+    """One subject's questions: records by id plus the encoded quiz payload"""
+
+    __slots__ = ('records', 'by_id', 'payload')
+
+    def __init__(self, records, version):
+        self.records = tuple(records)
+        self.by_id = {r.id: r for r in self.records}
+        self.payload = CachedJSON([r.as_dict() for r in self.records], version)
+
+    @property
+    def version(self):
+        return self.payload.version
+
+
+class QuestionCache:
+    """Per-subject question records, rebuilt when the bank version changes
+
+    ``loader(subject_id)`` returns ``QuestionRecord`` objects.  Subjects
+    without questions aren't cached, so unknown ids can't grow the cache.
+    """
+
+    def __init__(self, version, loader):
+        self.version = version
+        self.loader = loader
+        self._subjects = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, subject_id):
+        current = self.version.value
+        entry = self._subjects.get(subject_id)
+        if entry is not None and entry.version == current:
+            self.hits += 1
+            return entry
+        with self._lock:
+            entry = self._subjects.get(subject_id)
+            if entry is None or entry.version != current:
+                self.misses += 1
+                entry = SubjectQuestions(self.loader(subject_id), current)
+                if entry.records:
+                    self._subjects[subject_id] = entry
+                else:
+                    self._subjects.pop(subject_id, None)
+        return entry
+
+    def peek(self, subject_id):
+        """The subject's entry if it is cached and current, without loading"""
+        entry = self._subjects.get(subject_id)
+        if entry is not None and entry.version == self.version.value:
+            self.hits += 1
+            return entry
+        return None
+
+    def warm(self, subject_ids):
+        """Load every listed subject now, so quiz starts skip the database"""
+        for subject_id in subject_ids:
+            self.get(subject_id)
+        return len(self._subjects)
+
+    def response(self, subject_id):
+        response = json_response(self.get(subject_id).payload, 'private, no-cache')
+        if response.status_code == 304:
+            self.not_modified += 1
+        return response
+
+    def get_stats(self):
+        entries = list(self._subjects.values())
+        return {
+            'subjects': len(entries),
+            'questions': sum(len(e.records) for e in entries),
+            'payload_bytes': sum(len(e.payload.body) for e in entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+        }
+
+
+class SubjectIndex:
+    __slots__ = ('version', 'all', 'by_difficulty')
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.all = array('q')
+        self.by_difficulty = {}
+        for question_id, difficulty in rows:
+            self.all.append(question_id)
+            key = (difficulty or '').lower()
+            if key not in self.by_difficulty:
+                self.by_difficulty[key] = array('q')
+            self.by_difficulty[key].append(question_id)
+
+
+class QuestionIndex:
+    """Per-subject, per-difficulty arrays of question ids for sampling
+
+    Eight bytes per question, so even a very large bank can be sampled
+    without loading question text.  ``loader(subject_id)`` returns
+    ``(id, difficulty)`` pairs.
+    """
+
+    def __init__(self, version, loader):
+        self.version = version
+        self.loader = loader
+        self._subjects = {}
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.rebuilds = 0
+
+    def get(self, subject_id):
+        current = self.version.value
+        entry = self._subjects.get(subject_id)
+        if entry is not None and entry.version == current:
+            return entry
+        with self._lock:
+            entry = self._subjects.get(subject_id)
+            if entry is None or entry.version != current:
+                self.rebuilds += 1
+                entry = SubjectIndex(self.loader(subject_id), current)
+                if entry.all:
+                    self._subjects[subject_id] = entry
+                else:
+                    self._subjects.pop(subject_id, None)
+        return entry
+
+    def sample(self, subject_id, count, difficulty, rng):
+        """Up to ``count`` distinct ids in random order, O(count)"""
+        entry = self.get(subject_id)
+        ids = entry.by_difficulty.get(difficulty.lower(), ()) if difficulty else entry.all
+        self.samples += 1
+        return rng.sample(ids, min(count, len(ids)))
+
+    def get_stats(self):
+        entries = list(self._subjects.values())
+        return {
+            'subjects': len(entries),
+            'questions': sum(len(e.all) for e in entries),
+            'samples': self.samples,
+            'rebuilds': self.rebuilds,
+        }
@@ -0,0 +1,193 @@
+"""Server-side quiz sessions
+
+Starting a quiz opens a ``QuizSession`` holding the question ids served
+and the player's choices; the client only ever sees an opaque token and
+the questions.  Answers are locked in one at a time without feedback; the
+score is computed here at submission, never taken from the client, and
+only then are the correct answers revealed.
+
+Choices are packed two bits per question into one int, next to a bitmap of
+answered questions (bit ``2 * i`` for question ``i``), so a 100-question
+session costs a few hundred bytes.  ``grade`` compares all choices against
+the packed answer key at once with a handful of big-int operations.
+
+Sessions expire ``ttl`` seconds after they start.  Each user can hold at
+most ``per_user`` live sessions (starting another drops that user's
+oldest), so one player can't push everyone else's quizzes out; the whole
+store is also bounded by ``max_sessions``.  It lives in process memory, so
+a quiz must be finished on the process that started it.
+
+Submitting is two steps: ``claim`` reserves the session so it can't be
+answered or submitted again, then ``finish`` removes it once the score is
+saved, or ``release`` hands it back if saving failed.
+"""
+import secrets
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+def pack(choices):
+    """Option indexes (0-3) packed two bits each, first question lowest"""
+    packed = 0
+    for i, choice in enumerate(choices):
+        packed |= choice << (2 * i)
+    return packed
+
+
+def low_bits(count):
+    """Bit 2*i set for every i < count"""
+    return ((1 << (2 * count)) - 1) // 3
+
+
+class QuizSession:
+    __slots__ = ('token', 'user_id', 'subject_id', 'question_ids', 'choices', 'answered', 'expires', 'claimed')
+
+    def __init__(self, token, user_id, subject_id, question_ids, expires):
+        self.token = token
+        self.user_id = user_id
+        self.subject_id = subject_id
+        self.question_ids = array('q', question_ids)
+        self.choices = 0
+        self.answered = 0
+        self.expires = expires
+        self.claimed = False
+
+    def position(self, question_id):
+        """Index of the question in this quiz, or None"""
+        try:
+            return self.question_ids.index(question_id)
+        except ValueError:
+            return None
+
+    def is_answered(self, position):
+        return bool(self.answered >> (2 * position) & 1)
+
+    def answered_count(self):
+        return bin(self.answered).count('1')
+
+    def choice(self, position):
+        """The locked-in option index, None if unanswered"""
+        if not self.is_answered(position):
+            return None
+        return self.choices >> (2 * position) & 3
+
+    def answer(self, position, choice):
+        """Lock in a choice, False if the question was already answered"""
+        if self.is_answered(position):
+            return False
+        self.choices |= choice << (2 * position)
+        self.answered |= 1 << (2 * position)
+        return True
+
+    def grade(self, key, known):
+        """Number of correct answers against the packed ``key``
+
+        ``known`` has bit ``2 * i`` set for questions still in the bank; a
+        question that has since been deleted counts as wrong.
+        """
+        diff = self.choices ^ key
+        same = ~(diff | (diff >> 1)) & self.answered & known
+        return bin(same & low_bits(len(self.question_ids))).count('1')
+
+
+class QuizSessionStore:
+    """Sessions by token, expiring ``ttl`` seconds after creation"""
+
+    def __init__(self, ttl=3600.0, max_sessions=100000, per_user=3):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.per_user = per_user
+        self._sessions = OrderedDict()  # creation order == expiry order
+        self._by_user = {}  # user id -> OrderedDict of that user's tokens
+        self._lock = threading.Lock()
+        self.created = 0
+        self.submitted = 0
+        self.expired = 0
+        self.replaced = 0
+        self.evicted = 0
+
+    def _remove(self, token):
+        quiz = self._sessions.pop(token)
+        tokens = self._by_user[quiz.user_id]
+        del tokens[token]
+        if not tokens:
+            del self._by_user[quiz.user_id]
+        return quiz
+
+    def _purge(self, now):
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.expires > now:
+                break
+            self._remove(oldest.token)
+            self.expired += 1
+
+    def create(self, user_id, subject_id, question_ids):
+        now = time.monotonic()
+        quiz = QuizSession(secrets.token_urlsafe(16), user_id, subject_id, question_ids, now + self.ttl)
+        with self._lock:
+            self._purge(now)
+            # The user's own oldest quizzes go first ...
+            tokens = self._by_user.get(user_id)
+            while tokens and len(tokens) >= self.per_user:
+                self._remove(next(iter(tokens)))
+                self.replaced += 1
+            # ... and only a store full of other users' quizzes evicts globally
+            while len(self._sessions) >= self.max_sessions:
+                self._remove(next(iter(self._sessions)))
+                self.evicted += 1
+            self._sessions[quiz.token] = quiz
+            self._by_user.setdefault(user_id, OrderedDict())[quiz.token] = None
+            self.created += 1
+        return quiz
+
+    def answer(self, quiz, position, choice):
+        """Lock in a choice under the store lock (see ``QuizSession.answer``)"""
+        with self._lock:
+            return quiz.answer(position, choice)
+
+    def get(self, token, user_id):
+        """The user's live, unclaimed session for ``token``, or None"""
+        quiz = self._sessions.get(token) if isinstance(token, str) else None
+        if quiz is None or quiz.claimed or quiz.user_id != user_id or quiz.expires <= time.monotonic():
+            return None
+        return quiz
+
+    def claim(self, token, user_id):
+        """Reserve the user's live session for submission, so it scores once"""
+        with self._lock:
+            quiz = self.get(token, user_id)
+            if quiz is not None:
+                quiz.claimed = True
+        return quiz
+
+    def finish(self, quiz):
+        """Remove a claimed session once its score is saved"""
+        with self._lock:
+            if self._sessions.get(quiz.token) is quiz:
+                self._remove(quiz.token)
+            self.submitted += 1
+
+    def release(self, quiz):
+        """Hand a claimed session back after a failed submission"""
+        with self._lock:
+            quiz.claimed = False
+
+    def get_stats(self):
+        with self._lock:
+            self._purge(time.monotonic())
+            active = len(self._sessions)
+        return {
+            'active': active,
+            'max_sessions': self.max_sessions,
+            'per_user': self.per_user,
+            'users': len(self._by_user),
+            'ttl': self.ttl,
+            'created': self.created,
+            'submitted': self.submitted,
+            'expired': self.expired,
+            'replaced': self.replaced,
+            'evicted': self.evicted,
+        }
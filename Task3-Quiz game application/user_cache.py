@@ -0,0 +1,109 @@
+"""Cached profile records for signed-in users
+
+Every page load calls /api/check-auth, and every protected route needs
+the signed-in user, but profiles almost never change.  ``UserCache`` keeps
+small ``UserRecord`` objects by user id in a bounded LRU with a TTL, so
+the common authenticated request does no user-table query at all.
+
+``watch`` drops a user's record after any commit that updated or deleted
+that user, so username/email changes are seen on the next request; the
+TTL bounds staleness from writes made by other processes.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event  # pyright: ignore[reportMissingImports]
+
+_CHANGED_KEY = 'users_changed'
+
+
+class UserRecord:
+    __slots__ = ('id', 'username', 'email')
+
+    def __init__(self, id, username, email):
+        self.id = id
+        self.username = username
+        self.email = email
+
+    def as_dict(self):
+        return {'id': self.id, 'username': self.username, 'email': self.email}
+
+
+class UserCache:
+    """LRU of ``UserRecord`` by id, entries expire after ``ttl`` seconds
+
+    ``loader(user_id)`` returns a ``UserRecord`` or None.  Unknown ids
+    aren't cached, so stale sessions can't fill the cache.
+    """
+
+    def __init__(self, loader, size=1024, ttl=300.0):
+        self.loader = loader
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user id -> (record, expires)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        record = self.loader(user_id)
+        if record is not None:
+            self.put(record)
+        return record
+
+    def put(self, record):
+        with self._lock:
+            self._entries[record.id] = (record, time.monotonic() + self.ttl)
+            self._entries.move_to_end(record.id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def watch(self, session, model):
+        """Invalidate users whose rows a commit updated or deleted"""
+
+        @event.listens_for(session, 'after_flush')
+        def _after_flush(sess, flush_context):
+            for obj in itertools.chain(sess.dirty, sess.deleted):
+                if isinstance(obj, model):
+                    sess.info.setdefault(_CHANGED_KEY, set()).add(obj.id)
+
+        @event.listens_for(session, 'after_commit')
+        def _after_commit(sess):
+            for user_id in sess.info.pop(_CHANGED_KEY, ()):
+                self.invalidate(user_id)
+
+        @event.listens_for(session, 'after_rollback')
+        def _after_rollback(sess):
+            sess.info.pop(_CHANGED_KEY, None)
+
+        return self
+
+    def get_stats(self):
+        return {
+            'cached': len(self._entries),
+            'size': self.size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+        }
@@ -1,17 +1,23 @@
 from flask import Flask, render_template, request, jsonify # pyright: ignore[reportMissingImports]
 import sqlite3
+import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.sqlite_pool import ConnectionPool  # noqa: E402
+from shared.static_assets import AssetPipeline  # noqa: E402
+
 app = Flask(__name__)
 
 # Database setup
 DATABASE = 'todoist.db'
+pool = ConnectionPool(DATABASE).init_app(app)
+assets = AssetPipeline(app)
 
 def get_db():
-    """Create a database connection with row factory"""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get this thread's pooled database connection (rows as sqlite3.Row)"""
+    return pool.acquire()
 
 def init_db():
     """Initialize the database with tasks table"""
@@ -30,7 +36,6 @@ def init_db():
             )
         ''')
         db.commit()
-        db.close()
 
 # Routes
 @app.route('/')
@@ -45,8 +50,6 @@ def get_tasks():
     tasks = db.execute(
         'SELECT * FROM tasks ORDER BY completed ASC, priority ASC, due_date ASC'
     ).fetchall()
-    db.close()
-    
     tasks_list = []
     for task in tasks:
         tasks_list.append({
@@ -82,8 +85,6 @@ def add_task():
     
     task_id = cursor.lastrowid
     task = db.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
-    db.close()
-    
     return jsonify({
         'id': task['id'],
         'title': task['title'],
@@ -114,8 +115,6 @@ def update_task(task_id):
     db.commit()
     
     task = db.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
-    db.close()
-    
     if task:
         return jsonify({
             'id': task['id'],
@@ -139,10 +138,8 @@ def toggle_task(task_id):
         new_status = 0 if task['completed'] else 1
         db.execute('UPDATE tasks SET completed = ? WHERE id = ?', (new_status, task_id))
         db.commit()
-        db.close()
         return jsonify({'completed': new_status})
     
-    db.close()
     return jsonify({'error': 'Task not found'}), 404
 
 @app.route('/api/tasks/<int:task_id>', methods=['DELETE'])
@@ -151,10 +148,13 @@ def delete_task(task_id):
     db = get_db()
     db.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
     db.commit()
-    db.close()
-    
     return jsonify({'message': 'Task deleted'}), 200
 
+@app.route('/api/db-stats', methods=['GET'])
+def db_stats():
+    """Connection pool statistics"""
+    return jsonify(pool.get_stats())
+
 if __name__ == '__main__':
     init_db()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
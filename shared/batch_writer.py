@@ -0,0 +1,174 @@
+"""Bounded in-process queues written to the database in batches
+
+Requests push items onto a bounded queue and return; one background
+thread drains it and commits whole batches every ``batch_size`` items or
+every ``flush_interval`` seconds, whichever comes first, so a request
+never waits on the SQLite writer lock.
+
+Subclasses implement ``write(batch)``.  Exceptions listed in ``retry_on``
+(typically "database is locked" past the busy timeout) are retried up to
+``max_retries`` times; any other exception drops the batch at once.  In
+both cases the rows are counted as failed and the writer keeps running,
+so the queue keeps draining and ``flush()`` always returns.
+"""
+import atexit
+import contextlib
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """Bounded queue flushed in group commits by one writer thread"""
+
+    name = 'batch-writer'
+    retry_on = ()
+
+    def __init__(self, batch_size=200, flush_interval=0.05, max_pending=10000,
+                 put_timeout=0.0, max_retries=5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'queued': 0, 'rejected': 0, 'batches': 0, 'rows_written': 0, 'failed_rows': 0}
+
+    # ---- subclass hooks ----
+
+    def write(self, batch):
+        """Commit a list of queued items in one transaction"""
+        raise NotImplementedError
+
+    def batch_done(self, batch):
+        """Called after every batch, written or dropped"""
+
+    def writer_session(self):
+        """Context held by the thread that writes, e.g. a checked-out connection"""
+        return contextlib.nullcontext()
+
+    # ---- queue ----
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] = self._stats.get(name, 0) + amount
+
+    def start(self):
+        """Start the background writer and flush on interpreter exit"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+        return self
+
+    def put(self, item):
+        """Queue one item, False if the queue stayed full or is shut down"""
+        if self._stop.is_set():
+            return False
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            self._count('rejected')
+            return False
+        self._count('queued')
+        return True
+
+    def _next_batch(self):
+        """Block for the first item, then gather until the batch or time fills"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _write_all(self, items):
+        while items:
+            self._write(items[:self.batch_size])
+            items = items[self.batch_size:]
+
+    def _run(self):
+        with self.writer_session():
+            while not self._stop.is_set():
+                batch = self._next_batch()
+                if batch:
+                    self._write(batch)
+            # Shutdown: whatever is still queued gets written before we exit
+            self._write_all(self._drain())
+
+    def _write(self, batch):
+        try:
+            for attempt in range(self.max_retries):
+                try:
+                    self.write(batch)
+                    self._count('rows_written', len(batch))
+                    break
+                except self.retry_on:
+                    logger.warning('%s: write failed (attempt %d)', self.name, attempt + 1, exc_info=True)
+                    time.sleep(self.flush_interval * (attempt + 1))
+            else:
+                logger.error('%s: dropping %d queued rows after %d attempts', self.name, len(batch), self.max_retries)
+                self._count('failed_rows', len(batch))
+        except Exception:
+            # Not worth retrying (constraint violation, bad data ...); drop
+            # the batch but keep the writer alive so the queue keeps draining
+            logger.exception('%s: dropping %d queued rows after a failed write', self.name, len(batch))
+            self._count('failed_rows', len(batch))
+        finally:
+            try:
+                self.batch_done(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+                self._count('batches')
+
+    def flush(self):
+        """Block until everything queued so far has been written or dropped"""
+        self._queue.join()
+
+    def shutdown(self, timeout=10.0):
+        """Stop accepting items and write the rest"""
+        if self._thread is None or self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        # An item may have slipped in between the writer's final drain and
+        # its exit; write those from this thread.
+        leftover = self._drain()
+        if leftover:
+            with self.writer_session():
+                self._write_all(leftover)
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            'pending': self._queue.qsize(),
+            'max_pending': self._queue.maxsize,
+            'batch_size': self.batch_size,
+            'flush_interval_ms': int(self.flush_interval * 1000),
+        })
+        return stats
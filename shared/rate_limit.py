@@ -0,0 +1,141 @@
+"""Per-client token-bucket admission control for expensive endpoints
+
+Form and auth endpoints cost a database write or a password hash per hit.
+``RateLimiter.limit`` wraps a view so the bucket for (client IP, endpoint)
+is checked before the view body runs; a request that finds the bucket
+empty is rejected with 429 and a Retry-After header without touching the
+database.
+
+Buckets live in one LRU-ordered dict capped at ``max_entries``.  Each is a
+two-slot object (tokens, last refill time), so even a full table of 100k
+clients stays in the low tens of MB, and a flood of spoofed addresses only
+evicts the least recently seen clients instead of growing memory.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, request  # pyright: ignore[reportMissingImports]
+
+
+class Bucket:
+    __slots__ = ('tokens', 'stamp')
+
+    def __init__(self, tokens, stamp):
+        self.tokens = tokens
+        self.stamp = stamp
+
+
+class RouteCounters:
+    __slots__ = ('allowed', 'rejected', 'rate', 'burst')
+
+    def __init__(self, rate, burst):
+        self.allowed = 0
+        self.rejected = 0
+        self.rate = rate
+        self.burst = burst
+
+
+def _default_rejection(retry_after):
+    return jsonify({'error': 'Too many requests, please try again later.'})
+
+
+class RateLimiter:
+    """Token buckets keyed by (client IP, endpoint) with LRU eviction"""
+
+    def __init__(self, app=None, max_entries=100000, on_reject=_default_rejection):
+        self.max_entries = max_entries
+        self.on_reject = on_reject
+        self.enabled = True
+        self.trust_proxy = False
+        self.evictions = 0
+        self._buckets = OrderedDict()
+        self._routes = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        self.trust_proxy = app.config.get('RATE_LIMIT_TRUST_PROXY', False)
+        self.max_entries = app.config.get('RATE_LIMIT_MAX_ENTRIES', self.max_entries)
+        return self
+
+    def client_ip(self):
+        if self.trust_proxy and request.access_route:
+            return request.access_route[0]
+        return request.remote_addr or 'unknown'
+
+    def consume(self, key, rate, burst, now=None):
+        """Take one token from ``key``'s bucket
+
+        Returns 0 if the request is admitted, otherwise the number of
+        seconds until a token will be available.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = Bucket(burst, now)
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_entries:
+                    self._buckets.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._buckets.move_to_end(key)
+                bucket.tokens = min(burst, bucket.tokens + (now - bucket.stamp) * rate)
+                bucket.stamp = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0
+            return (1 - bucket.tokens) / rate
+
+    def limit(self, rate, burst=None, per='second', methods=None):
+        """Decorator: allow ``rate`` requests per ``per`` with bursts of ``burst``
+
+        ``per`` is 'second' or 'minute'.  Only requests whose method is in
+        ``methods`` are counted (all methods if omitted).
+        """
+        per_second = rate / (60.0 if per == 'minute' else 1.0)
+        burst = burst or max(1, int(rate))
+        methods = {m.upper() for m in methods} if methods else None
+
+        def decorator(view):
+            counters = RouteCounters(per_second, burst)
+            self._routes[view.__name__] = counters
+
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                if self.enabled and (methods is None or request.method in methods):
+                    retry_after = self.consume((self.client_ip(), view.__name__), per_second, burst)
+                    if retry_after:
+                        counters.rejected += 1
+                        response = self.on_reject(retry_after)
+                        response.status_code = 429
+                        response.headers['Retry-After'] = str(math.ceil(retry_after))
+                        return response
+                    counters.allowed += 1
+                return view(*args, **kwargs)
+            return wrapped
+        return decorator
+
+    def get_stats(self):
+        with self._lock:
+            tracked = len(self._buckets)
+        return {
+            'enabled': self.enabled,
+            'tracked_clients': tracked,
+            'max_entries': self.max_entries,
+            'evictions': self.evictions,
+            'routes': {
+                name: {
+                    'allowed': c.allowed,
+                    'rejected': c.rejected,
+                    'rate_per_second': round(c.rate, 4),
+                    'burst': c.burst,
+                }
+                for name, c in self._routes.items()
+            },
+        }
@@ -0,0 +1,226 @@
+"""Pooled SQLite connections tuned for concurrent web traffic
+
+Every app used to open a fresh connection per request with the default
+rollback journal.  ``ConnectionPool`` keeps connections alive between
+requests instead: a thread checks a connection out on first use, keeps it
+for the rest of the request, and hands it back at teardown so the next
+request on any thread can reuse it.  Each connection is opened in WAL mode
+with a busy timeout, so readers no longer block the writer and concurrent
+writers wait instead of failing with "database is locked".
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',   # durable in WAL mode, skips the fsync per commit
+    'cache_size': -16000,      # negative value = KiB, so ~16 MB page cache
+    'temp_store': 'MEMORY',
+}
+
+
+def apply_pragmas(conn, pragmas=None, busy_timeout=5.0):
+    """Apply tuning pragmas to a raw DB-API connection"""
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA busy_timeout = %d' % int(busy_timeout * 1000))
+    for name, value in (pragmas or DEFAULT_PRAGMAS).items():
+        cursor.execute('PRAGMA %s = %s' % (name, value))
+    cursor.close()
+
+
+class PoolStats:
+    """Thread-safe counters describing how a pool is being used"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.discarded = 0
+        self.rollbacks = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def checkout(self, reused):
+        with self._lock:
+            self.checkouts += 1
+            if reused:
+                self.reused += 1
+            else:
+                self.created += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checkin(self):
+        with self._lock:
+            self.checkins += 1
+            self.in_use -= 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'created': self.created,
+                'reused': self.reused,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'discarded': self.discarded,
+                'rollbacks': self.rollbacks,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'hit_rate': round(self.reused / self.checkouts, 4) if self.checkouts else 0.0,
+            }
+
+
+class ConnectionPool:
+    """Pool of long-lived SQLite connections, one checked out per thread"""
+
+    def __init__(self, database, max_idle=8, busy_timeout=5.0,
+                 cached_statements=256, pragmas=None, row_factory=sqlite3.Row):
+        self.database = database
+        self.max_idle = max_idle
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.row_factory = row_factory
+        self.stats = PoolStats()
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+    def _connect(self):
+        # Connections are only ever used by the thread that checked them out,
+        # but they move between threads across requests, so the sqlite3
+        # same-thread check has to be disabled.
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.busy_timeout,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+        )
+        conn.row_factory = self.row_factory
+        apply_pragmas(conn, self.pragmas, self.busy_timeout)
+        return conn
+
+    def acquire(self):
+        """Return the connection checked out by the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Connection pool is closed')
+            conn = self._idle.pop() if self._idle else None
+        reused = conn is not None
+        if conn is None:
+            conn = self._connect()
+        self.stats.checkout(reused)
+        self._local.conn = conn
+        return conn
+
+    def release(self, exc=None):
+        """Give the current thread's connection back to the pool
+
+        Any transaction left open (for example by a handler that raised
+        before committing) is rolled back so it cannot leak into the next
+        request that picks this connection up.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        self.stats.checkin()
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+                self.stats.incr('rollbacks')
+        except sqlite3.Error:
+            conn.close()
+            self.stats.incr('discarded')
+            return
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+        self.stats.incr('discarded')
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out for the duration of a ``with`` block
+
+        Used outside of request handling (startup, CLI commands, background
+        threads).  If the thread already holds a connection it is shared and
+        left checked out.
+        """
+        owned = getattr(self._local, 'conn', None) is None
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            if owned:
+                self.release()
+
+    def close_all(self):
+        """Close every idle connection and refuse new checkouts"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def init_app(self, app):
+        """Release the request's connection when the app context ends"""
+        app.teardown_appcontext(self.release)
+        return self
+
+    def get_stats(self):
+        """Snapshot of pool counters and configuration"""
+        with self._lock:
+            idle = len(self._idle)
+        stats = self.stats.as_dict()
+        stats.update({
+            'database': self.database,
+            'idle': idle,
+            'max_idle': self.max_idle,
+            'cached_statements': self.cached_statements,
+            'pragmas': self.pragmas,
+        })
+        return stats
+
+
+def configure_sqlalchemy(engine, pragmas=None, busy_timeout=5.0):
+    """Apply the same pragmas to every connection a SQLAlchemy engine opens
+
+    Returns a ``PoolStats`` fed by the engine's pool events, so the SQLAlchemy
+    app can report the same numbers as the raw sqlite3 apps.
+    """
+    from sqlalchemy import event  # pyright: ignore[reportMissingImports]
+
+    stats = PoolStats()
+    pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_conn, connection_record):
+        apply_pragmas(dbapi_conn, pragmas, busy_timeout)
+        connection_record.info['fresh'] = True
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_conn, connection_record, connection_proxy):
+        stats.checkout(reused=not connection_record.info.pop('fresh', False))
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_conn, connection_record):
+        stats.checkin()
+
+    @event.listens_for(engine, 'close')
+    def _on_close(dbapi_conn, connection_record):
+        stats.incr('discarded')
+
+    return stats
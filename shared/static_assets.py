@@ -0,0 +1,180 @@
+"""Fingerprinted, precompressed static assets
+
+At startup (or via ``flask build-assets``) every file under the app's
+``static`` folder is copied to ``static/dist`` under a content-hashed name
+(``css/style.css`` -> ``css/style.1a2b3c4d5e6f.css``), next to ``.gz`` and,
+when the ``brotli`` module is installed, ``.br`` siblings.  A manifest maps
+logical names to hashed ones.
+
+Templates call ``asset_url('css/style.css')`` to get the hashed URL.  Since a
+hashed URL can never point at different content, it is served with a one
+year ``immutable`` Cache-Control, so browsers stop revalidating it on every
+page view; the precompressed sibling matching Accept-Encoding is sent as-is
+from disk rather than compressed per request.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import abort, request, send_file, url_for  # pyright: ignore[reportMissingImports]
+
+try:
+    import brotli  # pyright: ignore[reportMissingImports]
+except ImportError:  # optional, .gz siblings only without it
+    brotli = None
+
+COMPRESSIBLE = {'.css', '.js', '.json', '.svg', '.txt', '.html', '.map', '.xml'}
+MIN_COMPRESS_SIZE = 256
+ONE_YEAR = 31536000
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def _hashed_name(logical, digest):
+    base, ext = os.path.splitext(logical)
+    return '%s.%s%s' % (base, digest, ext)
+
+
+class AssetPipeline:
+    """Builds and serves content-hashed copies of an app's static files"""
+
+    def __init__(self, app=None, url_prefix='/assets'):
+        self.url_prefix = url_prefix
+        self.manifest = {}
+        self._files = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, build=True):
+        self.app = app
+        self.source_dir = app.static_folder
+        self.dist_dir = os.path.join(app.static_folder, DIST_DIR)
+        app.add_url_rule(self.url_prefix + '/<path:filename>', 'assets', self.serve)
+        app.add_template_global(self.asset_url, 'asset_url')
+
+        @app.cli.command('build-assets')
+        def build_assets():
+            """Fingerprint and precompress static files"""
+            manifest = self.build()
+            print('Built %d assets into %s' % (len(manifest), self.dist_dir))
+
+        if build and app.config.get('ASSET_PIPELINE', True):
+            self.build()
+        return self
+
+    def _source_files(self):
+        for root, dirs, files in os.walk(self.source_dir):
+            if os.path.abspath(root) == os.path.abspath(self.source_dir):
+                dirs[:] = [d for d in dirs if d != DIST_DIR]
+            for name in files:
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, self.source_dir).replace(os.sep, '/'), path
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def build(self):
+        """Write hashed copies + compressed siblings, return the manifest
+
+        Files whose hash is unchanged since the last build are left alone,
+        so a restart without asset changes only costs one hash per file.
+        """
+        previous = self._load_manifest()
+        manifest = {}
+        keep = {MANIFEST}
+        for logical, path in self._source_files():
+            hashed = _hashed_name(logical, _hash_file(path))
+            manifest[logical] = hashed
+            target = os.path.join(self.dist_dir, hashed)
+            keep.add(hashed)
+            if previous.get(logical) != hashed or not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(path, target)
+            self._compress(target, keep, hashed)
+
+        self._remove_stale(keep)
+        with open(os.path.join(self.dist_dir, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        self._index(manifest)
+        return manifest
+
+    def _compress(self, target, keep, hashed):
+        if os.path.splitext(target)[1] not in COMPRESSIBLE or os.path.getsize(target) < MIN_COMPRESS_SIZE:
+            return
+        data = None
+        encoders = [('.gz', lambda d: gzip.compress(d, 9, mtime=0))]
+        if brotli is not None:
+            encoders.append(('.br', lambda d: brotli.compress(d, quality=11)))
+        for suffix, encode in encoders:
+            keep.add(hashed + suffix)
+            if os.path.exists(target + suffix):
+                continue
+            if data is None:
+                with open(target, 'rb') as f:
+                    data = f.read()
+            compressed = encode(data)
+            if len(compressed) < len(data):
+                with open(target + suffix, 'wb') as f:
+                    f.write(compressed)
+
+    def _remove_stale(self, keep):
+        for root, _, files in os.walk(self.dist_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.relpath(path, self.dist_dir).replace(os.sep, '/') not in keep:
+                    os.remove(path)
+
+    def _index(self, manifest):
+        files = {}
+        for hashed in manifest.values():
+            path = os.path.join(self.dist_dir, hashed)
+            variants = {}
+            if os.path.exists(path + '.br'):
+                variants['br'] = path + '.br'
+            if os.path.exists(path + '.gz'):
+                variants['gzip'] = path + '.gz'
+            mimetype = mimetypes.guess_type(hashed)[0] or 'application/octet-stream'
+            files[hashed] = (path, mimetype, variants)
+        self._files = files
+        self.manifest = manifest
+
+    def asset_url(self, filename):
+        """URL of the fingerprinted copy, or the plain static URL if unbuilt"""
+        hashed = self.manifest.get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=hashed)
+
+    def serve(self, filename):
+        entry = self._files.get(filename)
+        if entry is None:
+            abort(404)
+        path, mimetype, variants = entry
+        coding = None
+        for candidate in ('br', 'gzip'):
+            if candidate in variants and candidate in request.accept_encodings:
+                coding, path = candidate, variants[candidate]
+                break
+        # Name the asset, not the .br/.gz file on disk, in Content-Disposition
+        response = send_file(path, mimetype=mimetype, conditional=True, max_age=ONE_YEAR,
+                             download_name=filename.rsplit('/', 1)[-1])
+        response.headers['Cache-Control'] = 'public, max-age=%d, immutable' % ONE_YEAR
+        response.headers['Vary'] = 'Accept-Encoding'
+        if coding:
+            response.headers['Content-Encoding'] = coding
+        return response